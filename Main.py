@@ -5,10 +5,26 @@ from PyQt5.QtCore import QThread
 
 from gui.windows.MainWindow import MainWindow
 
+from stream.detection.YoloDetector import YoloDetector
+from stream.detection.Deepsort.DeepsortTracker import DeepSortTracker
+from utils.ConfigManager import ConfigManager
 from utils.benchmark.MetricSignals   import signals
 from utils.benchmark.MetricReporter  import MetricReporter
 
 
+def preload_models():
+    # loaded and warmed up in the background; streams opened later share them
+    cfg = ConfigManager()
+    if cfg.get_detection_config().get("detector_process", False):
+        return
+    yolo = cfg.get_yolo_config()
+    if yolo.get("version") and yolo.get("device"):
+        YoloDetector.preload(yolo)
+    device = cfg.get_deepsort_config().get("device")
+    if device:
+        DeepSortTracker.preload(device)
+
+
 def main():
 
     metrics_thread = QThread()
@@ -19,8 +35,10 @@ def main():
     signals.detection_logged.connect( reporter.on_detection)
     signals.inspection_logged.connect(reporter.on_inspection)
     signals.delay_logged.connect(     reporter.on_delay)
+    signals.model_load_logged.connect(reporter.on_model_load)
 
     metrics_thread.start()
+    preload_models()
 
     app = QtWidgets.QApplication(sys.argv)
 
@@ -47,6 +47,10 @@ class EditConfigDialog(QtWidgets.QDialog):
         yolo = self.config.get("yolo", {})
         self.fields['yolo_device'] = QtWidgets.QLineEdit(str(yolo.get("device", "")))
         layout.addRow("YOLO Device", self.fields['yolo_device'])
+        self.fields['yolo_backend'] = QtWidgets.QComboBox()
+        self.fields['yolo_backend'].addItems(["torch", "onnx", "openvino"])
+        self.fields['yolo_backend'].setCurrentText(str(yolo.get("backend", "torch")))
+        layout.addRow("YOLO Backend", self.fields['yolo_backend'])
         self.fields['yolo_version'] = QtWidgets.QLineEdit(str(yolo.get("version", "")))
         layout.addRow("YOLO Version", self.fields['yolo_version'])
         self.fields['yolo_imgsz'] = QtWidgets.QSpinBox()
@@ -115,6 +119,23 @@ class EditConfigDialog(QtWidgets.QDialog):
         self.fields['deepsort_nn_budget'].setMaximum(9999)
         self.fields['deepsort_nn_budget'].setValue(int(deepsort.get("nn_budget", 100)))
         layout.addRow("DeepSort NN Budget", self.fields['deepsort_nn_budget'])
+        self.fields['deepsort_gating_threshold'] = QtWidgets.QDoubleSpinBox()
+        self.fields['deepsort_gating_threshold'].setDecimals(4)
+        self.fields['deepsort_gating_threshold'].setMaximum(9999)
+        self.fields['deepsort_gating_threshold'].setValue(float(deepsort.get("gating_threshold", 0.0)))
+        layout.addRow("DeepSort Gating Threshold", self.fields['deepsort_gating_threshold'])
+        self.fields['deepsort_max_iou_distance'] = QtWidgets.QDoubleSpinBox()
+        self.fields['deepsort_max_iou_distance'].setSingleStep(0.05)
+        self.fields['deepsort_max_iou_distance'].setRange(0, 1)
+        self.fields['deepsort_max_iou_distance'].setValue(float(deepsort.get("max_iou_distance", 0.7)))
+        layout.addRow("DeepSort Max IOU Distance", self.fields['deepsort_max_iou_distance'])
+        self.fields['deepsort_lazy_appearance'] = QtWidgets.QCheckBox()
+        self.fields['deepsort_lazy_appearance'].setChecked(bool(deepsort.get("lazy_appearance", False)))
+        layout.addRow("DeepSort Lazy Appearance", self.fields['deepsort_lazy_appearance'])
+        self.fields['deepsort_appearance_refresh'] = QtWidgets.QSpinBox()
+        self.fields['deepsort_appearance_refresh'].setMaximum(9999)
+        self.fields['deepsort_appearance_refresh'].setValue(int(deepsort.get("appearance_refresh", 10)))
+        layout.addRow("DeepSort Appearance Refresh", self.fields['deepsort_appearance_refresh'])
 
         #detection Thread
         det = self.config.get("detection_thread", {})
@@ -133,6 +154,79 @@ class EditConfigDialog(QtWidgets.QDialog):
         self.fields['enable_mot_writer'].setChecked(bool(det.get("enable_mot_writer", True)))
         layout.addRow("Enable MOT Writer", self.fields['enable_mot_writer'])
 
+        self.fields['grab_only'] = QtWidgets.QCheckBox()
+        self.fields['grab_only'].setChecked(bool(det.get("grab_only", False)))
+        layout.addRow("Decode Sampled Frames Only", self.fields['grab_only'])
+
+        self.fields['offline'] = QtWidgets.QCheckBox()
+        self.fields['offline'].setChecked(bool(det.get("offline", False)))
+        layout.addRow("Offline (Unpaced) Video Processing", self.fields['offline'])
+
+        self.fields['adaptive_rate'] = QtWidgets.QCheckBox()
+        self.fields['adaptive_rate'].setChecked(bool(det.get("adaptive_rate", False)))
+        layout.addRow("Adaptive Detection Rate", self.fields['adaptive_rate'])
+
+        self.fields['min_det_fps'] = QtWidgets.QDoubleSpinBox()
+        self.fields['min_det_fps'].setRange(0.1, 500)
+        self.fields['min_det_fps'].setValue(float(det.get("min_detection_fps", 2)))
+        layout.addRow("Min Detection FPS", self.fields['min_det_fps'])
+
+        self.fields['max_det_fps'] = QtWidgets.QDoubleSpinBox()
+        self.fields['max_det_fps'].setRange(0.1, 500)
+        self.fields['max_det_fps'].setValue(float(det.get("max_detection_fps", 15)))
+        layout.addRow("Max Detection FPS", self.fields['max_det_fps'])
+
+        self.fields['roi_crop'] = QtWidgets.QCheckBox()
+        self.fields['roi_crop'].setChecked(bool(det.get("roi_crop", False)))
+        layout.addRow("Crop Detection To Regions", self.fields['roi_crop'])
+
+        self.fields['roi_padding'] = QtWidgets.QSpinBox()
+        self.fields['roi_padding'].setMaximum(1000)
+        self.fields['roi_padding'].setValue(int(det.get("roi_padding", 32)))
+        layout.addRow("Region Crop Padding (px)", self.fields['roi_padding'])
+
+        self.fields['roi_tiles'] = QtWidgets.QSpinBox()
+        self.fields['roi_tiles'].setRange(1, 8)
+        self.fields['roi_tiles'].setValue(int(det.get("roi_tiles", 1)))
+        layout.addRow("Region Crop Tiles", self.fields['roi_tiles'])
+
+        self.fields['batch_size'] = QtWidgets.QSpinBox()
+        self.fields['batch_size'].setRange(1, 16)
+        self.fields['batch_size'].setValue(int(det.get("batch_size", 1)))
+        layout.addRow("Detection Batch Size", self.fields['batch_size'])
+
+        self.fields['batch_timeout_ms'] = QtWidgets.QSpinBox()
+        self.fields['batch_timeout_ms'].setMaximum(1000)
+        self.fields['batch_timeout_ms'].setValue(int(det.get("batch_timeout_ms", 50)))
+        layout.addRow("Detection Batch Timeout (ms)", self.fields['batch_timeout_ms'])
+
+        self.fields['detection_cache'] = QtWidgets.QCheckBox()
+        self.fields['detection_cache'].setChecked(bool(det.get("detection_cache", False)))
+        layout.addRow("Cache Offline Detections", self.fields['detection_cache'])
+
+        self.fields['cache_dir'] = QtWidgets.QLineEdit(str(det.get("cache_dir", "detection_cache")))
+        layout.addRow("Detection Cache Folder", self.fields['cache_dir'])
+
+        self.fields['detector_process'] = QtWidgets.QCheckBox()
+        self.fields['detector_process'].setChecked(bool(det.get("detector_process", False)))
+        layout.addRow("Run Detector In Worker Process", self.fields['detector_process'])
+
+        self.fields['full_detection_interval'] = QtWidgets.QSpinBox()
+        self.fields['full_detection_interval'].setRange(1, 100)
+        self.fields['full_detection_interval'].setValue(int(det.get("full_detection_interval", 1)))
+        layout.addRow("Full Detection Every N Frames", self.fields['full_detection_interval'])
+
+        self.fields['refine_imgsz'] = QtWidgets.QSpinBox()
+        self.fields['refine_imgsz'].setRange(32, 1280)
+        self.fields['refine_imgsz'].setSingleStep(32)
+        self.fields['refine_imgsz'].setValue(int(det.get("refine_imgsz", 256)))
+        layout.addRow("Track Window Image Size", self.fields['refine_imgsz'])
+
+        self.fields['refine_padding'] = QtWidgets.QSpinBox()
+        self.fields['refine_padding'].setMaximum(1000)
+        self.fields['refine_padding'].setValue(int(det.get("refine_padding", 32)))
+        layout.addRow("Track Window Padding", self.fields['refine_padding'])
+
         #crosswalk monitor
         cwm = self.config.get("crosswalk_monitor", {})
         self.fields['cwm_tl_fps'] = QtWidgets.QSpinBox()
@@ -194,8 +288,11 @@ class EditConfigDialog(QtWidgets.QDialog):
 
     def _on_ok(self):
         try:
+            if self.fields['min_det_fps'].value() > self.fields['max_det_fps'].value():
+                raise ValueError("Min Detection FPS must not exceed Max Detection FPS")
             yolo = {
                 "device": self.fields['yolo_device'].text(),
+                "backend": self.fields['yolo_backend'].currentText(),
                 "version": self.fields['yolo_version'].text(),
                 "imgsz": self.fields['yolo_imgsz'].value(),
                 "conf": self.fields['yolo_conf'].value(),
@@ -211,12 +308,32 @@ class EditConfigDialog(QtWidgets.QDialog):
                 "motion_weight": self.fields['deepsort_motion_weight'].value(),
                 "iou_weight": self.fields['deepsort_iou_weight'].value(),
                 "nn_budget": self.fields['deepsort_nn_budget'].value(),
+                "gating_threshold": self.fields['deepsort_gating_threshold'].value(),
+                "max_iou_distance": self.fields['deepsort_max_iou_distance'].value(),
+                "lazy_appearance": self.fields['deepsort_lazy_appearance'].isChecked(),
+                "appearance_refresh": self.fields['deepsort_appearance_refresh'].value(),
             }
 
             det = {
                 "detection_fps": self.fields['det_fps'].value(),
                 "delay_seconds": self.fields['det_delay'].value(),
                 "enable_mot_writer": self.fields['enable_mot_writer'].isChecked(),
+                "grab_only": self.fields['grab_only'].isChecked(),
+                "offline": self.fields['offline'].isChecked(),
+                "adaptive_rate": self.fields['adaptive_rate'].isChecked(),
+                "min_detection_fps": self.fields['min_det_fps'].value(),
+                "max_detection_fps": self.fields['max_det_fps'].value(),
+                "roi_crop": self.fields['roi_crop'].isChecked(),
+                "roi_padding": self.fields['roi_padding'].value(),
+                "roi_tiles": self.fields['roi_tiles'].value(),
+                "batch_size": self.fields['batch_size'].value(),
+                "batch_timeout_ms": self.fields['batch_timeout_ms'].value(),
+                "detection_cache": self.fields['detection_cache'].isChecked(),
+                "cache_dir": self.fields['cache_dir'].text(),
+                "detector_process": self.fields['detector_process'].isChecked(),
+                "full_detection_interval": self.fields['full_detection_interval'].value(),
+                "refine_imgsz": self.fields['refine_imgsz'].value(),
+                "refine_padding": self.fields['refine_padding'].value(),
             }
 
             cwm = {
@@ -58,6 +58,10 @@ class VideoPlayerWindow(QtWidgets.QMainWindow):
         signals.scheduling_logged.connect(self._update_scheduling_label)
         signals.total_latency_logged.connect(self._update_total_latency_label)
         signals.consumer_logged.connect(self._update_consumer_label)
+        signals.timer_lateness_logged.connect(self._metric_reporter.on_timer_lateness)
+        signals.timer_lateness_logged.connect(self._update_timer_lateness_label)
+        signals.queue_drop_logged.connect(self._metric_reporter.on_queue_drop)
+        signals.queue_drop_logged.connect(self._update_queue_drop_label)
 
         self.backend = VideoStreamController(self.location, self.state, self.editor)
         self.backend.frame_ready.connect(self._update_frame)
@@ -116,6 +120,12 @@ class VideoPlayerWindow(QtWidgets.QMainWindow):
         self.consumer_label = QtWidgets.QLabel("Consumer latency: 0.00 s")
         side_layout.addWidget(self.consumer_label)
 
+        self.timer_lateness_label = QtWidgets.QLabel("Timer lateness: 0.000 s")
+        side_layout.addWidget(self.timer_lateness_label)
+
+        self.queue_drop_label = QtWidgets.QLabel("Dropped frames: video 0, detection 0")
+        side_layout.addWidget(self.queue_drop_label)
+
         stop_btn = QtWidgets.QPushButton("Stop Stream")
         stop_btn.clicked.connect(self.stop_stream)
         side_layout.addWidget(stop_btn)
@@ -153,6 +163,17 @@ class VideoPlayerWindow(QtWidgets.QMainWindow):
     def _update_consumer_label(self, dt):
         self.consumer_label.setText(f"Consumer latency: {dt:.2f} s")
 
+    def _update_timer_lateness_label(self, dt):
+        self.timer_lateness_label.setText(f"Timer lateness: {dt:.3f} s")
+
+    def _update_queue_drop_label(self, *_):
+        if not self.backend:
+            return
+        self.queue_drop_label.setText(
+            f"Dropped frames: video {self.backend.video_queue.dropped}, "
+            f"detection {self.backend.detection_queue.dropped}"
+        )
+
     def _update_frame(self, q_img):
         signals.frame_logged.emit()
         pixmap = QtGui.QPixmap.fromImage(q_img)
@@ -164,7 +185,9 @@ class VideoPlayerWindow(QtWidgets.QMainWindow):
         )
         self.video_label.setPixmap(scaled)
         self.scaled_pixmap_size = (scaled.width(), scaled.height())
-        self.original_frame_size = (pixmap.width(), pixmap.height())
+        # boxes are in source pixels, the displayed image may be downscaled
+        source_size = self.backend.producer.source_size if self.backend and self.backend.producer else None
+        self.original_frame_size = source_size or (pixmap.width(), pixmap.height())
         self.overlay.resize(self.video_label.size())
         self.overlay.update()
 
@@ -183,9 +206,10 @@ class VideoPlayerWindow(QtWidgets.QMainWindow):
         self.overlay.set_detections(objects, self.original_frame_size, self.scaled_pixmap_size)
         self.overlay.raise_()
 
-        delay = time.time() - capture_time
-        self.latency_label.setText(f"Delay: {delay:.2f} s")
-        signals.delay_logged.emit(delay)
+        if not self.backend.offline:
+            delay = time.time() - capture_time
+            self.latency_label.setText(f"Delay: {delay:.2f} s")
+            signals.delay_logged.emit(delay)
 
         self._update_birds_eye(objects)
 
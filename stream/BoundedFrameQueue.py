@@ -0,0 +1,74 @@
+import collections
+import queue
+import threading
+
+from utils.benchmark.MetricSignals import signals
+
+
+class BoundedFrameQueue:
+    """Fixed-capacity FIFO for the video path that never grows without limit.
+
+    put() evicts the oldest item once the queue is full (counted in
+    ``dropped``); put_wait() blocks for space instead, for offline runs.
+    Evicted items are passed to ``on_drop`` so that their frame references
+    can be released.
+    """
+
+    def __init__(self, name: str, maxsize: int, on_drop=None):
+        if maxsize < 1:
+            raise ValueError("BoundedFrameQueue maxsize must be >= 1")
+        self.name    = name
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items  = collections.deque()
+        self._cond   = threading.Condition()
+
+    def resize(self, maxsize: int):
+        evicted = []
+        with self._cond:
+            self.maxsize = max(1, maxsize)
+            while len(self._items) > self.maxsize:
+                evicted.append(self._items.popleft())
+            self.dropped += len(evicted)
+            self._cond.notify_all()
+        for item in evicted:
+            self._drop(item)
+
+    def put(self, item):
+        evicted = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                evicted = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify_all()
+        if evicted is not None:
+            self._drop(evicted)
+
+    def put_wait(self, item, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout=timeout):
+                raise queue.Full
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout=timeout):
+                raise queue.Empty
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _drop(self, item):
+        if self.on_drop is not None:
+            self.on_drop(item)
+        signals.queue_drop_logged.emit(self.name)
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+
+class FrameRef:
+    """Read-only, reference-counted handle on a decoded frame.
+
+    Every consumer that receives a ref owns one reference and must call
+    release() once it no longer touches ``frame``.
+    """
+
+    def __init__(self, ring, slot, buffer):
+        self._ring = ring
+        self._slot = slot
+        self._refs = 1
+        self._lock = threading.Lock()
+        self.frame = buffer.view()
+        self.frame.flags.writeable = False
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    def retain(self, count: int = 1):
+        with self._lock:
+            if self._refs <= 0:
+                raise RuntimeError("FrameRef retained after release")
+            self._refs += count
+        return self
+
+    def release(self):
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            done = self._refs == 0
+        if done and self._ring is not None:
+            self._ring._recycle(self._slot)
+
+    @classmethod
+    def wrap(cls, frame: np.ndarray):
+        # unpooled ref around an array that was allocated elsewhere
+        return cls(None, None, frame)
+
+
+class FrameRing:
+    """Preallocated pool of frame buffers that capture decodes straight into.
+
+    Slot buffers are allocated lazily on the first decode (the capture picks the
+    shape) and reused afterwards; a slot returns to the pool only after every
+    FrameRef handed out for it has been released.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("FrameRing capacity must be >= 1")
+        self.capacity = capacity
+        self._buffers = [None] * capacity
+        self._free = list(range(capacity))
+        self._cond = threading.Condition()
+        self.overflows = 0
+
+    def acquire(self, timeout: float = 0.0):
+        """Return a free slot index, or None if the pool stayed exhausted."""
+        with self._cond:
+            if not self._free and timeout > 0:
+                self._cond.wait_for(lambda: self._free, timeout=timeout)
+            if not self._free:
+                self.overflows += 1
+                return None
+            return self._free.pop()
+
+    def buffer(self, slot):
+        return None if slot is None else self._buffers[slot]
+
+    def commit(self, slot, frame: np.ndarray) -> FrameRef:
+        """Wrap the frame decoded for ``slot`` in a ref owned by the caller.
+
+        ``frame`` is normally the slot buffer itself; when the capture had to
+        allocate (first frame, resolution change, exhausted pool) the new array
+        becomes the slot buffer.
+        """
+        if slot is None:
+            return FrameRef.wrap(frame)
+        self._buffers[slot] = frame
+        return FrameRef(self, slot, frame)
+
+    def discard(self, slot):
+        if slot is not None:
+            self._recycle(slot)
+
+    def free_slots(self) -> int:
+        with self._cond:
+            return len(self._free)
+
+    def _recycle(self, slot):
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify()
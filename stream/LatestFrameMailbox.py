@@ -0,0 +1,61 @@
+import queue
+import threading
+
+from utils.benchmark.MetricSignals import signals
+
+
+class LatestFrameMailbox:
+    """Single-slot "latest wins" hand-off between the producer and detection.
+
+    put() replaces an item the consumer has not picked up yet (counted in
+    ``dropped``, like BoundedFrameQueue); put_wait() is the backpressure variant used for offline
+    runs and blocks until the slot is free. Replaced items are passed to
+    ``on_drop`` so that their frame references can be released.
+    """
+
+    maxsize = 1
+
+    def __init__(self, name: str, on_drop=None):
+        self.name      = name
+        self.on_drop   = on_drop
+        self.dropped   = 0
+        self._item     = None
+        self._has_item = False
+        self._cond     = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            replaced, had_item = self._item, self._has_item
+            self._item, self._has_item = item, True
+            if had_item:
+                self.dropped += 1
+            self._cond.notify_all()
+        if had_item:
+            self._drop(replaced)
+
+    def put_wait(self, item, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: not self._has_item, timeout=timeout):
+                raise queue.Full
+            self._item, self._has_item = item, True
+            self._cond.notify_all()
+
+    def get(self, timeout: float = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._has_item, timeout=timeout):
+                raise queue.Empty
+            item, self._item, self._has_item = self._item, None, False
+            self._cond.notify_all()
+            return item
+
+    def qsize(self) -> int:
+        with self._cond:
+            return 1 if self._has_item else 0
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _drop(self, item):
+        if self.on_drop is not None:
+            self.on_drop(item)
+        signals.queue_drop_logged.emit(self.name)
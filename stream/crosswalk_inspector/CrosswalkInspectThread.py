@@ -8,11 +8,12 @@ from PyQt5 import QtCore
 from stream.crosswalk_inspector.CrosswalkPackMonitor import CrosswalkPackMonitor
 from stream.crosswalk_inspector.Region import Region
 from stream.crosswalk_inspector.TrafficLight import TrafficLight
+from stream.detection.DetectionBatch import PERSON_CLASS_IDX
 from utils.RegionManager import RegionManager
 from utils.GlobalState import GlobalState
 
 class CrosswalkInspectThread(QtCore.QThread):
-    inspection_ready = QtCore.pyqtSignal(list, float)
+    inspection_ready = QtCore.pyqtSignal(object, float)
     error_signal      = QtCore.pyqtSignal(str)
 
     def __init__(
@@ -25,6 +26,7 @@ class CrosswalkInspectThread(QtCore.QThread):
         location_name: str = "unknown",
         is_live: bool = True,
         delay_seconds: float = 0.0,
+        use_stream_time: bool = False,
         parent=None
     ):
         super().__init__(parent)
@@ -34,6 +36,7 @@ class CrosswalkInspectThread(QtCore.QThread):
         self.homography_inv     = homography_inv
         self.is_live            = is_live
         self.delay_seconds      = delay_seconds
+        self.use_stream_time    = use_stream_time
         self._running           = True
         self._last_check        = 0.0
 
@@ -105,14 +108,23 @@ class CrosswalkInspectThread(QtCore.QThread):
     def run(self):
         try:
             while self._running:
-                now = time.time()
-                if now - self._last_check < self.check_period:
-                    time.sleep(0.005)
-                    continue
-                self._last_check = now
-
-                objects, ts = self.global_state.get()
-                if not objects:
+                if self.use_stream_time:
+                    # offline runs outpace the wall clock, so the check period
+                    # is measured on the video timestamps stored in the state
+                    objects, ts = self.global_state.get_batch()
+                    if ts - self._last_check < self.check_period:
+                        time.sleep(0.005)
+                        continue
+                    self._last_check = ts
+                else:
+                    now = time.time()
+                    if now - self._last_check < self.check_period:
+                        time.sleep(0.005)
+                        continue
+                    self._last_check = now
+
+                    objects, ts = self.global_state.get_batch()
+                if not len(objects):
                     continue
 
                 if not self.is_live:
@@ -136,11 +148,9 @@ class CrosswalkInspectThread(QtCore.QThread):
                     for pid in self.monitors
                 }
 
-                for det in objects:
-                    if det.object_type == "person":
-                        pt = getattr(det, "surface_point", None) or getattr(det, "raw_surface_point", None)
-                        if pt is not None:
-                            self._handle_pedestrian_sidewalk_transition(det.id, pt, timestr)
+                persons = objects[objects.cls == PERSON_CLASS_IDX]
+                for tid, pt in zip(persons.track_id.tolist(), persons.point.tolist()):
+                    self._handle_pedestrian_sidewalk_transition(tid, pt, timestr)
 
                 for pid, monitor in self.monitors.items():
                     monitor.process_frame(objects, datetime.fromtimestamp(ts))
@@ -1,5 +1,6 @@
 from stream.crosswalk_inspector.EntityState import EntityState
 from stream.crosswalk_inspector.Region import Region
+from stream.detection.DetectedObject import DetectedObject
 
 
 class CrosswalkPackMonitor:
@@ -11,19 +12,14 @@ class CrosswalkPackMonitor:
         self.entities = {}
 
     def process_frame(self, detections, timestamp):
-        for det in detections:
-
-            tid = det.id
-            cls = det.object_type
-
+        # detections is a DetectionBatch; only the columns are read
+        for tid, cls_idx, pt in zip(
+            detections.track_id.tolist(), detections.cls.tolist(), detections.point.tolist()
+        ):
             if tid not in self.entities:
-                self.entities[tid] = EntityState(tid, cls)
+                self.entities[tid] = EntityState(tid, DetectedObject.CLASS_NAMES.get(cls_idx, "unknown"))
 
             state = self.entities[tid]
-            pt = getattr(det, 'surface_point', None) or getattr(det, 'raw_surface_point', None)
-
-            if pt is None:
-                continue
 
             for idx, region in enumerate(self.ped_wait):
                 state.update_region(f"ped_wait_{idx}", region.contains(pt), timestamp)
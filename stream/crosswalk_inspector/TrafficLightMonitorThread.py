@@ -1,11 +1,11 @@
 import cv2
 import numpy as np
 import time
-import threading
 from typing import List, Tuple, Dict
 from PyQt5 import QtCore
 
 from stream.crosswalk_inspector.TrafficLight import TrafficLight
+from utils.TimerScheduler import TimerScheduler
 
 
 def hsv_color_classifier(crops: Dict[str, np.ndarray]) -> str:
@@ -109,21 +109,20 @@ class TrafficLightMonitorThread(QtCore.QThread):
             emit_time     = ts + self.delay
             schedule_delay = emit_time - now
 
+            # the classification is already done, the scheduler only has to
+            # apply it once the display delay has passed
             if schedule_delay <= 0:
-                self._update_light(tl, crops)
+                self._update_light(tl, crops, predicted)
             else:
-                timer = threading.Timer(
-                    schedule_delay,
-                    self._update_light,
-                    args=(tl, crops)
+                TimerScheduler.instance().call_later(
+                    schedule_delay, self._update_light, tl, crops, predicted
                 )
-                timer.daemon = True
-                timer.start()
 
-    def _update_light(self, tl: TrafficLight, crops: Dict[str, np.ndarray]):
+    def _update_light(self, tl: TrafficLight, crops: Dict[str, np.ndarray], result=None):
         crops_snapshot = dict(crops)
         tl.crops = {k: v.copy() for k, v in crops_snapshot.items()}
-        result = self.analyze_fn(crops)
+        if result is None:
+            result = self.analyze_fn(crops)
         tl.update_status(result)
 
     def run(self):
@@ -5,9 +5,14 @@ import torch.nn as nn
 import torch.nn.functional as F
 import numpy as np
 import cv2
-import torchvision.transforms as T
 from torchvision.models import resnet50, ResNet50_Weights
 
+from utils.ModelRegistry import ModelRegistry
+
+REID_HEIGHT, REID_WIDTH = 256, 128
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
 class ReIDModel(nn.Module):
     def __init__(self, embedding_dim: int = 512):
         super().__init__()
@@ -48,36 +53,63 @@ class CNNFeatureExtractor:
             model.load_state_dict(state_dict, strict=False)
         self.model = model.to(self.device).eval()
 
-        self.transform = T.Compose([
-            T.ToPILImage(),
-            T.Resize((256, 128)),
-            T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406],
-                        std=[0.229, 0.224, 0.225]),
-        ])
-
-    def _preprocess(self, crops: list[np.ndarray]) -> torch.Tensor:
-        tensor_list = []
-        for crop in crops:
-            if crop.size == 0:
-                crop = np.zeros((128, 256, 3), dtype=np.uint8)
-            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-            tensor_list.append(self.transform(crop))
-        return torch.stack(tensor_list, dim=0)
+        # crops are resized straight into this uint8 batch; colour order,
+        # scaling and normalisation then happen once for the whole batch.
+        # Mean and std are in 0..255 units so the uint8 values need no /255
+        self._crops = np.zeros((0, REID_HEIGHT, REID_WIDTH, 3), dtype=np.uint8)
+        self._mean = torch.tensor(IMAGENET_MEAN, device=self.device).view(1, 3, 1, 1) * 255.0
+        self._std = torch.tensor(IMAGENET_STD, device=self.device).view(1, 3, 1, 1) * 255.0
+        # shared through ModelRegistry, and so is the crop buffer
+        self._lock = ModelRegistry.instance().inference_lock(self.model_key(device, checkpoint_path))
+
+    @staticmethod
+    def model_key(device, checkpoint_path):
+        return "reid", checkpoint_path, str(device), "torch"
+
+    @classmethod
+    def load(cls, device, checkpoint_path):
+        extractor = cls(device=device, checkpoint_path=checkpoint_path)
+        # one dummy person-sized crop so the first real frame is not the slow one
+        extractor.extract_features_batch(np.zeros((256, 128, 3), dtype=np.uint8), [(0, 0, 128, 256)])
+        return extractor
+
+    @classmethod
+    def shared(cls, device, checkpoint_path):
+        """The process-wide extractor for these weights, loaded on first use."""
+        return ModelRegistry.instance().get(
+            cls.model_key(device, checkpoint_path), lambda: cls.load(device, checkpoint_path)
+        )
+
+    @classmethod
+    def preload(cls, device, checkpoint_path):
+        return ModelRegistry.instance().preload(
+            cls.model_key(device, checkpoint_path), lambda: cls.load(device, checkpoint_path)
+        )
+
+    def _preprocess(self, frame: np.ndarray, bboxes) -> torch.Tensor:
+        n = len(bboxes)
+        if len(self._crops) < n:
+            self._crops = np.zeros((max(n, 2 * len(self._crops)), REID_HEIGHT, REID_WIDTH, 3), dtype=np.uint8)
+        h, w = frame.shape[:2]
+        for i, (x1, y1, x2, y2) in enumerate(bboxes):
+            patch = frame[max(0, int(y1)):min(h, int(y2)), max(0, int(x1)):min(w, int(x2))]
+            if patch.size == 0:
+                self._crops[i] = 0
+                continue
+            # area averaging when shrinking, like the antialiased PIL resize it replaces
+            interp = cv2.INTER_AREA if patch.shape[0] > REID_HEIGHT else cv2.INTER_LINEAR
+            cv2.resize(patch, (REID_WIDTH, REID_HEIGHT), dst=self._crops[i], interpolation=interp)
+
+        batch = torch.from_numpy(self._crops[:n]).to(self.device)
+        # NHWC BGR uint8 -> NCHW RGB float, normalised
+        batch = batch.permute(0, 3, 1, 2).flip(1).float()
+        return batch.sub_(self._mean).div_(self._std)
 
     def extract_features_batch(self, frame: np.ndarray,
                                bboxes: list[tuple[int, int, int, int]]) -> np.ndarray:
-        patches = []
-        for x1, y1, x2, y2 in bboxes:
-            patch = frame[y1:y2, x1:x2]
-            if patch.size == 0:
-                patch = np.zeros((128, 256, 3), dtype=np.uint8)
-            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2RGB)
-            patches.append(self.transform(patch))
-        if not patches:
+        if len(bboxes) == 0:
             return np.zeros((0, self.model.embedding.out_features), dtype=np.float32)
-        batch = torch.stack(patches, dim=0).to(self.device)
-        with torch.no_grad():
-            feats = self.model(batch).cpu()
+        with self._lock, torch.no_grad():
+            feats = self.model(self._preprocess(frame, bboxes)).cpu()
             feats = F.normalize(feats, p=2, dim=1)
             return feats.numpy().astype(np.float32)
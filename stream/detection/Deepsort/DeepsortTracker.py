@@ -2,13 +2,83 @@ from __future__ import annotations
 
 import numpy as np
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix, bmat
+from scipy.sparse.csgraph import connected_components
 from concurrent.futures import ThreadPoolExecutor
 
+from stream.detection.DetectionBatch import DetectionBatch
 from stream.detection.Deepsort.CNNFeatureExtractor import CNNFeatureExtractor
+from stream.detection.Deepsort.FeatureGallery import FeatureGallery
+from stream.detection.Deepsort.KalmanFilter import BatchKalmanFilter
 from stream.detection.Deepsort.Track import Track
 
 PERSON_CLASS_IDX = 0
 VEHICLE_CLASSES = [1,2,3,5,7]
+PERSON_REID_PATH = "PPLR+CAJ_market1501_86.1.pth"
+VEHICLE_REID_PATH = "PPLR+CAJ_veri_45.3.pth"
+# chi-square 0.95 quantile for 2 degrees of freedom (the position), the
+# usual gating_threshold
+CHI2_GATE_95 = 5.9915
+INFEASIBLE_COST = 1e6
+# below this many cells one dense solve beats splitting into components
+# (python -m utils.benchmark.AssignmentBenchmark)
+DENSE_ASSIGN_CELLS = 100_000
+
+def iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) boxes in inclusive pixel coordinates."""
+    a = np.asarray(boxes_a, dtype=float)[:, None, :]
+    b = np.asarray(boxes_b, dtype=float)[None, :, :]
+    iw = np.maximum(0.0, np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]) + 1)
+    ih = np.maximum(0.0, np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]) + 1)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0] + 1) * (a[..., 3] - a[..., 1] + 1)
+    area_b = (b[..., 2] - b[..., 0] + 1) * (b[..., 3] - b[..., 1] + 1)
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union != 0)
+
+
+def assign_dense(cost_matrix, feasible):
+    """One Hungarian solve with infeasible cells masked; only feasible pairs are returned."""
+    rows_idx, cols_idx = linear_sum_assignment(np.where(feasible, cost_matrix, INFEASIBLE_COST))
+    ok = feasible[rows_idx, cols_idx]
+    return rows_idx[ok], cols_idx[ok]
+
+
+def assign_components(cost_matrix, feasible):
+    """The same assignment solved per connected component of feasible pairs."""
+    n_tracks, n_dets = feasible.shape
+    if not feasible.any():
+        return np.array([], dtype=int), np.array([], dtype=int)
+    graph = csr_matrix(feasible)
+    n_comp, labels = connected_components(bmat([[None, graph], [graph.T, None]]), directed=False)
+    track_labels, det_labels = labels[:n_tracks], labels[n_tracks:]
+    track_count = np.bincount(track_labels, minlength=n_comp)
+    det_count = np.bincount(det_labels, minlength=n_comp)
+
+    # one track and one detection: the pair is the answer, no solve needed
+    single = (track_count == 1) & (det_count == 1)
+    single_tracks = np.flatnonzero(single[track_labels])
+    single_dets = np.flatnonzero(single[det_labels])
+    rows_idx = [single_tracks[np.argsort(track_labels[single_tracks])]]
+    cols_idx = [single_dets[np.argsort(det_labels[single_dets])]]
+
+    shared = np.flatnonzero((track_count > 0) & (det_count > 0) & ~single)
+    if len(shared):
+        track_order = np.argsort(track_labels, kind="stable")
+        det_order = np.argsort(det_labels, kind="stable")
+        track_start = np.cumsum(track_count) - track_count
+        det_start = np.cumsum(det_count) - det_count
+        for comp in shared:
+            r = track_order[track_start[comp]:track_start[comp] + track_count[comp]]
+            c = det_order[det_start[comp]:det_start[comp] + det_count[comp]]
+            sub_feasible = feasible[np.ix_(r, c)]
+            sub = np.where(sub_feasible, cost_matrix[np.ix_(r, c)], INFEASIBLE_COST)
+            ri, ci = linear_sum_assignment(sub)
+            ok = sub_feasible[ri, ci]
+            rows_idx.append(r[ri[ok]])
+            cols_idx.append(c[ci[ok]])
+    return np.concatenate(rows_idx), np.concatenate(cols_idx)
+
 
 class DeepSortTracker:
     def __init__(
@@ -21,8 +91,14 @@ class DeepSortTracker:
         iou_weight: float,
         nn_budget: int,
         homography_matrix,
-        person_reid_path: str,
-        vehicle_reid_path: str,
+        person_reid_path: str = PERSON_REID_PATH,
+        vehicle_reid_path: str = VEHICLE_REID_PATH,
+        person_extractor=None,
+        vehicle_extractor=None,
+        gating_threshold: float = 0.0,
+        max_iou_distance: float = 0.7,
+        lazy_appearance: bool = False,
+        appearance_refresh: int = 10,
     ):
 
         self.next_track_id = 0
@@ -34,11 +110,25 @@ class DeepSortTracker:
         self.iou_weight = iou_weight
         self.homography_matrix = homography_matrix
         self.nn_budget = nn_budget
+        self.gating_threshold = gating_threshold
+        self.max_iou_distance = max_iou_distance
+        self.lazy_appearance = lazy_appearance
+        self.appearance_refresh = appearance_refresh
+        self.gallery = FeatureGallery(nn_budget)
+        self.kalman = BatchKalmanFilter()
 
-        self.person_extractor = CNNFeatureExtractor(device=device, checkpoint_path=person_reid_path)
-        self.vehicle_extractor = CNNFeatureExtractor(device=device, checkpoint_path=vehicle_reid_path)
+        # anything with extract_features_batch(), e.g. a worker process proxy
+        self.person_extractor = person_extractor or CNNFeatureExtractor.shared(device, person_reid_path)
+        self.vehicle_extractor = vehicle_extractor or CNNFeatureExtractor.shared(device, vehicle_reid_path)
 
         self.executor = ThreadPoolExecutor(max_workers=1)
+        # ReID embeddings of the detections passed to the last update()
+        self.last_features = None
+
+    @staticmethod
+    def preload(device, person_reid_path=PERSON_REID_PATH, vehicle_reid_path=VEHICLE_REID_PATH):
+        CNNFeatureExtractor.preload(device, person_reid_path)
+        CNNFeatureExtractor.preload(device, vehicle_reid_path)
 
     def calibrate_point(self, point, homography_matrix):
         pt = np.array([point[0], point[1], 1.0], dtype=np.float32)
@@ -49,178 +139,291 @@ class DeepSortTracker:
         else:
             return transformed[0], transformed[1]
 
-    def _iou(self, bbox1, bbox2):
-        xA = max(bbox1[0], bbox2[0])
-        yA = max(bbox1[1], bbox2[1])
-        xB = min(bbox1[2], bbox2[2])
-        yB = min(bbox1[3], bbox2[3])
-
-        interArea = max(0, xB - xA + 1) * max(0, yB - yA + 1)
-        boxAArea = (bbox1[2] - bbox1[0] + 1) * (bbox1[3] - bbox1[1] + 1)
-        boxBArea = (bbox2[2] - bbox2[0] + 1) * (bbox2[3] - bbox2[1] + 1)
-        unionArea = float(boxAArea + boxBArea - interArea)
-        if unionArea == 0:
-            return 0.0
-        return interArea / unionArea
-
-    def _compute_cost(self, detections, timestamp: float, detection_fps: float):
-        n_tracks = len(self.tracks)
-        n_dets = len(detections)
-        if n_tracks == 0:
-            empty = np.empty((0, n_dets), dtype=float)
-            return empty, empty, empty
-
-        cost_matrix = np.zeros((n_tracks, n_dets), dtype=float)
-        motion_matrix = np.zeros_like(cost_matrix)
-        appearance_matrix = np.zeros_like(cost_matrix)
-        iou_matrix = np.zeros_like(cost_matrix)
+    def _predict(self, timestamp: float, detection_fps: float):
+        if not self.tracks:
+            return
+        pred = self.kalman.predict(
+            [t.kalman_filter.slot for t in self.tracks], 1.0 / detection_fps
+        )[:, :2]
+        for track, centroid in zip(self.tracks, pred):
+            track.centroid = (centroid[0], centroid[1])
+            if timestamp is not None:
+                track.last_timestamp = timestamp
+
+    def _class_groups(self, det_cls, track_free=None, det_free=None):
+        """(track indices, detection indices) per class present on both sides.
+
+        Tracks only ever match detections of their own class, so each group
+        is costed and assigned on its own and no cross-class cell exists.
+        track_free / det_free masks leave already matched ones out.
+        """
+        track_cls = np.array(
+            [t.bbox[4] if len(t.bbox) > 4 else PERSON_CLASS_IDX for t in self.tracks], dtype=float
+        )
+        det_cls = np.asarray(det_cls, dtype=float)
+        if track_free is not None:
+            track_cls[~track_free] = np.nan
+        if det_free is not None:
+            det_cls = np.where(det_free, det_cls, np.nan)
+        for cls in np.intersect1d(track_cls[~np.isnan(track_cls)], det_cls[~np.isnan(det_cls)]):
+            yield np.flatnonzero(track_cls == cls), np.flatnonzero(det_cls == cls)
+
+    def _unambiguous(self, points, rows):
+        """Matches that are certain before any ReID embedding is computed.
+
+        A pair qualifies when the track was seen on the last frame, their IoU
+        passes the IoU stage, and neither side has any other candidate even at
+        a perfect appearance score. Whatever the embeddings said, the cascade
+        or the IoU stage would pair exactly these two. Returns track and
+        detection indices and the motion distances.
+        """
+        out_r, out_c, out_m = [], [], []
+        for track_idx, det_idx in self._class_groups(rows[:, 4]):
+            tracks = [self.tracks[i] for i in track_idx]
+            pred = self.kalman.x[[t.kalman_filter.slot for t in tracks], :2]
+            motion = np.linalg.norm(pred[:, None, :] - np.asarray(points[det_idx], dtype=float)[None], axis=2)
+            iou_dist = 1.0 - iou_matrix([t.bbox[:4] for t in tracks], rows[det_idx, :4])
+            iou_ok = iou_dist <= self.max_iou_distance
+            recent = np.array([t.time_since_update == 0 for t in tracks])
+            candidate = (
+                self.motion_weight * motion + self.iou_weight * iou_dist <= self.max_distance
+            ) | (recent[:, None] & iou_ok)
+            sole = (candidate.sum(axis=1) == 1)[:, None] & (candidate.sum(axis=0) == 1)[None, :]
+            r, c = np.nonzero(candidate & sole & iou_ok & recent[:, None])
+            out_r.extend(track_idx[r])
+            out_c.extend(det_idx[c])
+            out_m.extend(motion[r, c])
+        return np.asarray(out_r, dtype=int), np.asarray(out_c, dtype=int), out_m
+
+    def _compute_cost(self, track_idx, points, rows, features):
+        """Cost, motion and appearance matrices of tracks[track_idx] against detections."""
+        tracks = [self.tracks[i] for i in track_idx]
+        slots = [t.kalman_filter.slot for t in tracks]
+        pred = self.kalman.x[slots, :2]
+        track_boxes = np.array([t.bbox[:4] for t in tracks], dtype=float).reshape(-1, 4)
+
+        motion_matrix = np.linalg.norm(pred[:, None, :] - np.asarray(points, dtype=float)[None], axis=2)
+        appearance_matrix = self.gallery.distances([t.gallery_slot for t in tracks], features)
+        iou = iou_matrix(track_boxes, rows[:, :4])
+        cost_matrix = (
+            self.motion_weight * motion_matrix
+            + self.appearance_weight * appearance_matrix
+            + self.iou_weight * (1.0 - iou)
+        )
+        return cost_matrix, motion_matrix, appearance_matrix
 
-        for i, track in enumerate(self.tracks):
-            track_cls = track.bbox[4] if len(track.bbox) > 4 else PERSON_CLASS_IDX
-            pred_centroid = track.predict_with_dt(detection_fps, timestamp)
-            gallery = track.get_gallery()
-            if gallery:
-                gallery_arr = np.stack(gallery, axis=0)
-                gallery_norms = np.linalg.norm(gallery_arr, axis=1) + 1e-6
-            else:
-                gallery_arr = None
-
-            for j, (det_centroid, det_bbox, det_feat) in enumerate(detections):
-                det_cls = det_bbox[4] if len(det_bbox) > 4 else PERSON_CLASS_IDX
-                if det_cls != track_cls:
-                    cost_matrix[i, j] = 1e6
-                    motion_matrix[i, j] = 1e6
-                    appearance_matrix[i, j] = 1e6
-                    iou_matrix[i, j] = 0.0
-                    continue
-
-                m_dist = np.linalg.norm(np.asarray(pred_centroid) - np.asarray(det_centroid))
-                motion_matrix[i, j] = m_dist
-
-                if det_feat is not None and gallery_arr is not None:
-                    sims = gallery_arr @ det_feat / (gallery_norms * (np.linalg.norm(det_feat) + 1e-6))
-                    a_dist = 1.0 - float(np.max(sims))
-                else:
-                    a_dist = 1.0
-                appearance_matrix[i, j] = a_dist
-
-                iou_score = self._iou(track.bbox, det_bbox)
-                iou_matrix[i, j] = iou_score
-
-                cost_matrix[i, j] = (
-                    self.motion_weight * m_dist
-                    + self.appearance_weight * a_dist
-                    + self.iou_weight * (1.0 - iou_score)
-                )
+    def _feasible(self, cost_matrix, track_idx, points):
+        feasible = cost_matrix <= self.max_distance
+        if not self.gating_threshold or self.gating_threshold <= 0 or not feasible.any():
+            return feasible
+        # chi-square gate on the predicted position and its covariance. Tracks
+        # without a measured velocity yet are left ungated: their filter still
+        # predicts them standing still
+        tracks = [self.tracks[i] for i in track_idx]
+        moving = np.array([bool(t.velocity_history) for t in tracks])
+        if moving.any():
+            slots = [t.kalman_filter.slot for t, m in zip(tracks, moving) if m]
+            gate = self.kalman.gating_distance(slots, points)
+            feasible[moving] &= gate <= self.gating_threshold
+        return feasible
+
+    def _match_group(self, track_idx, points, rows, features):
+        """Matching cascade of one class group, then an IoU pass on what is left.
+
+        The cascade assigns tracks in order of time_since_update, most
+        recently seen first, each level against the detections still free,
+        so a long-lost track cannot take a detection from a fresh one. Tracks
+        seen on the last frame that the cascade left unmatched then get a
+        plain IoU assignment (1 - IoU <= max_iou_distance) to the leftover
+        detections, which needs no appearance and keeps brief misses from
+        spawning new tracks. Returns group-local (track, detection) indices
+        with the motion and appearance distances of each match.
+        """
+        cost_matrix, motion_matrix, appearance_matrix = self._compute_cost(track_idx, points, rows, features)
+        feasible = self._feasible(cost_matrix, track_idx, points)
+        since = np.array([self.tracks[i].time_since_update for i in track_idx])
+        track_free = np.ones(len(track_idx), dtype=bool)
+        det_free = np.ones(len(rows), dtype=bool)
+        matched_r, matched_c = [], []
+
+        def take(r, c):
+            track_free[r] = False
+            det_free[c] = False
+            matched_r.extend(r)
+            matched_c.extend(c)
+
+        for level in np.unique(since):
+            free_c = np.flatnonzero(det_free)
+            if not len(free_c):
+                break
+            level_r = np.flatnonzero(since == level)
+            r, c = self._assign(cost_matrix[np.ix_(level_r, free_c)], feasible[np.ix_(level_r, free_c)])
+            take(level_r[r], free_c[c])
+
+        iou_r = np.flatnonzero(track_free & (since == 0))
+        iou_c = np.flatnonzero(det_free)
+        if len(iou_r) and len(iou_c):
+            boxes = np.array([self.tracks[track_idx[i]].bbox[:4] for i in iou_r], dtype=float)
+            iou_cost = 1.0 - iou_matrix(boxes, rows[iou_c, :4])
+            r, c = self._assign(iou_cost, iou_cost <= self.max_iou_distance)
+            take(iou_r[r], iou_c[c])
+
+        matched_r = np.asarray(matched_r, dtype=int)
+        matched_c = np.asarray(matched_c, dtype=int)
+        return (
+            matched_r, matched_c,
+            motion_matrix[matched_r, matched_c], appearance_matrix[matched_r, matched_c],
+        )
 
-        return cost_matrix, motion_matrix, appearance_matrix
+    @staticmethod
+    def _assign(cost_matrix, feasible):
+        if not feasible.any():
+            return np.array([], dtype=int), np.array([], dtype=int)
+        # the split only pays off on large matrices, see AssignmentBenchmark
+        if feasible.size <= DENSE_ASSIGN_CELLS:
+            return assign_dense(cost_matrix, feasible)
+        return assign_components(cost_matrix, feasible)
 
     def remove_tracks(self, track_ids):
         removed = [t.track_id for t in self.tracks if t.track_id in track_ids]
         if removed:
             print(f"Removing tracks: {removed}")
-        self.tracks = [t for t in self.tracks if t.track_id not in track_ids]
+        self._keep_tracks(lambda t: t.track_id not in track_ids)
+
+    def _keep_tracks(self, keep):
+        kept = []
+        for t in self.tracks:
+            if keep(t):
+                kept.append(t)
+            else:
+                t.release()
+        self.tracks = kept
+
+    def _prune_lost(self):
+        removed_ids = [
+            t.track_id for t in self.tracks
+            if t.time_since_update > self.max_disappeared
+        ]
+        self._keep_tracks(lambda t: t.time_since_update <= self.max_disappeared)
+        return removed_ids
+
+    def _points(self, detections: DetectionBatch) -> np.ndarray:
+        # tracker point per detection: the calibrated ground point with a
+        # homography, the bbox centre without; whole pixels as before
+        box = detections.bbox
+        if self.homography_matrix is not None:
+            pts = np.column_stack([
+                np.trunc((box[:, 0] + box[:, 2]) / 2.0), np.trunc(box[:, 3]), np.ones(len(box))
+            ]).astype(np.float32)
+            proj = pts @ np.asarray(self.homography_matrix, dtype=np.float32).T
+            w = np.where(proj[:, 2] != 0, proj[:, 2], 1.0)
+            return (proj[:, :2] / w[:, None]).astype(np.float32)
+        return np.column_stack([
+            np.trunc((box[:, 0] + box[:, 2]) / 2.0), np.trunc((box[:, 1] + box[:, 3]) / 2.0)
+        ]).astype(np.float32)
+
+    def _extract_features(self, frame, detections: DetectionBatch, wanted=None) -> np.ndarray:
+        # rows left out by ``wanted`` stay NaN
+        boxes = detections.bbox.astype(np.int32)
+        vehicle = np.isin(detections.cls, VEHICLE_CLASSES)
+        if wanted is None:
+            wanted = np.ones(len(boxes), dtype=bool)
+        feats = None
+        for mask, extractor in ((~vehicle, self.person_extractor), (vehicle, self.vehicle_extractor)):
+            mask = mask & wanted
+            if not mask.any():
+                continue
+            out = extractor.extract_features_batch(frame, boxes[mask])
+            if feats is None:
+                feats = np.full((len(boxes), out.shape[1]), np.nan, dtype=np.float32)
+            feats[mask] = out
+        return feats
+
+    def _track_batch(self) -> DetectionBatch:
+        if not self.tracks:
+            return DetectionBatch.empty()
+        rows = np.array([t.bbox[:6] for t in self.tracks], dtype=np.float32)
+        batch = DetectionBatch.from_arrays(rows[:, :4], rows[:, 4], rows[:, 5])
+        rec = batch.records
+        rec["point"] = [t.centroid for t in self.tracks]
+        rec["track_id"] = [t.track_id for t in self.tracks]
+        rec["motion_dist"] = [np.nan if t.motion_distance is None else t.motion_distance for t in self.tracks]
+        rec["app_dist"] = [np.nan if t.appearance_distance is None else t.appearance_distance for t in self.tracks]
+        return batch
 
     def update(
             self,
-            rects,
+            detections: DetectionBatch,
             frame=None,
             features=None,
             timestamp: float | None = None,
             detection_fps=None,
     ):
+        """Match a frame's detections to the tracks.
 
-        if len(rects) == 0:
+        Returns the live tracks as a DetectionBatch (track_id, point and
+        distances filled in) and the ids retired for being unseen too long.
+        """
+        self.last_features = None
+        if len(detections) == 0:
             for track in self.tracks:
                 track.time_since_update += 1
-            removed_ids = [
-                t.track_id for t in self.tracks
-                if t.time_since_update > self.max_disappeared
-            ]
-            self.tracks = [
-                t for t in self.tracks
-                if t.time_since_update <= self.max_disappeared
-            ]
-            return {t.track_id: (t.centroid, t.bbox) for t in self.tracks}, removed_ids
-
-        # Build detection list: each entry is (calibrated_point, bbox_with_conf, feature)
-        detections = []
+            removed_ids = self._prune_lost()
+            return self._track_batch(), removed_ids
+
+        points = self._points(detections)
+        rows = detections.rows()
+        self._predict(timestamp, detection_fps)
+
+        rows_idx, cols_idx, motion = [], [], []
         if features is None and frame is not None:
-            bboxes_person = []
-            indices_person = []
-            bboxes_vehicle = []
-            indices_vehicle = []
-            points = []
-
-            for idx, rect in enumerate(rects):
-                if len(rect) == 6:
-                    x1, y1, x2, y2, cls, conf = rect
-                else:
-                    x1, y1, x2, y2, cls = rect
-                    conf = None
-
-                if self.homography_matrix is not None:
-                    spx = int((x1 + x2) / 2.0)
-                    spy = int(y2)
-                    calibrated = self.calibrate_point((spx, spy), self.homography_matrix)
-                else:
-                    cX = int((x1 + x2) / 2.0)
-                    cY = int((y1 + y2) / 2.0)
-                    calibrated = (cX, cY)
-                points.append(calibrated)
-
-                if cls == PERSON_CLASS_IDX:
-                    bboxes_person.append((x1, y1, x2, y2))
-                    indices_person.append(idx)
-                elif cls in VEHICLE_CLASSES:
-                    bboxes_vehicle.append((x1, y1, x2, y2))
-                    indices_vehicle.append(idx)
-                else:
-                    bboxes_person.append((x1, y1, x2, y2))
-                    indices_person.append(idx)
-
-            batch_features = [None] * len(rects)
-            if bboxes_person:
-                feats_person = self.person_extractor.extract_features_batch(frame, bboxes_person)
-                for i, idx in enumerate(indices_person):
-                    batch_features[idx] = feats_person[i]
-            if bboxes_vehicle:
-                feats_vehicle = self.vehicle_extractor.extract_features_batch(frame, bboxes_vehicle)
-                for i, idx in enumerate(indices_vehicle):
-                    batch_features[idx] = feats_vehicle[i]
-
-            for i, rect in enumerate(rects):
-                if len(rect) == 6:
-                    x1, y1, x2, y2, cls, conf = rect
-                else:
-                    x1, y1, x2, y2, cls = rect
-                    conf = None
-                detections.append((
-                    points[i],
-                    (x1, y1, x2, y2, cls, conf),
-                    batch_features[i]
-                ))
-
-        cost_matrix, motion_matrix, appearance_matrix = self._compute_cost(
-            detections, timestamp, detection_fps=detection_fps
-        )
-        if cost_matrix.size > 0:
-            rows, cols = linear_sum_assignment(cost_matrix)
-        else:
-            rows, cols = np.array([], dtype=int), np.array([], dtype=int)
+            wanted = None
+            if self.lazy_appearance and self.tracks:
+                # match the obvious pairs on motion and IoU alone; embed only
+                # the contested detections, the new ones and stale galleries
+                rows_idx, cols_idx, motion = self._unambiguous(points, rows)
+                wanted = np.ones(len(rows), dtype=bool)
+                wanted[cols_idx] = False
+                if self.appearance_refresh > 0:
+                    stale = np.array([
+                        self.tracks[r].frames_since_feature >= self.appearance_refresh for r in rows_idx
+                    ], dtype=bool)
+                    wanted[cols_idx[stale]] = True
+            features = self._extract_features(frame, detections, wanted)
+        self.last_features = features
+        has_feature = np.zeros(len(rows), dtype=bool) if features is None else ~np.isnan(features[:, 0])
+
+        track_free = np.ones(len(self.tracks), dtype=bool)
+        det_free = np.ones(len(rows), dtype=bool)
+        track_free[rows_idx] = False
+        det_free[cols_idx] = False
+        rows_idx, cols_idx, motion = list(rows_idx), list(cols_idx), list(motion)
+        appearance = [None] * len(rows_idx)
+        for track_idx, det_idx in self._class_groups(rows[:, 4], track_free, det_free):
+            r, c, m_dist, a_dist = self._match_group(
+                track_idx, points[det_idx], rows[det_idx],
+                features[det_idx] if features is not None else None,
+            )
+            rows_idx.extend(track_idx[r])
+            cols_idx.extend(det_idx[c])
+            motion.extend(m_dist)
+            appearance.extend(a_dist)
+        if rows_idx:
+            self.kalman.update(
+                [self.tracks[row].kalman_filter.slot for row in rows_idx], points[cols_idx]
+            )
 
         assigned_tracks, assigned_dets = set(), set()
-        for row, col in zip(rows, cols):
-            if cost_matrix[row, col] > self.max_distance:
-                continue
+        for row, col, m_dist, a_dist in zip(rows_idx, cols_idx, motion, appearance):
             track = self.tracks[row]
-            track.motion_distance = motion_matrix[row, col]
-            track.appearance_distance = appearance_matrix[row, col]
+            track.motion_distance = m_dist
+            track.appearance_distance = a_dist
             track.update(
-                detections[col][1],
-                detections[col][0],
-                feature=detections[col][2],
+                rows[col],
+                tuple(points[col]),
+                feature=features[col] if has_feature[col] else None,
                 timestamp=timestamp,
+                update_filter=False,
             )
             assigned_tracks.add(row)
             assigned_dets.add(col)
@@ -229,26 +432,21 @@ class DeepSortTracker:
             if i not in assigned_tracks:
                 track.time_since_update += 1
 
-        removed_ids = [
-            t.track_id for t in self.tracks
-            if t.time_since_update > self.max_disappeared
-        ]
-        self.tracks = [
-            t for t in self.tracks
-            if t.time_since_update <= self.max_disappeared
-        ]
+        removed_ids = self._prune_lost()
 
-        for j, (cent, bbox, feat) in enumerate(detections):
+        for j in range(len(rows)):
             if j not in assigned_dets:
                 new_track = Track(
                     self.next_track_id,
-                    bbox,
-                    cent,
-                    feature=feat,
+                    rows[j],
+                    tuple(points[j]),
+                    feature=features[j] if has_feature[j] else None,
                     nn_budget=self.nn_budget,
+                    gallery=self.gallery,
+                    kalman=self.kalman,
                 )
                 new_track.last_timestamp = timestamp
                 self.tracks.append(new_track)
                 self.next_track_id += 1
 
-        return {t.track_id: (t.centroid, t.bbox) for t in self.tracks}, removed_ids
+        return self._track_batch(), removed_ids
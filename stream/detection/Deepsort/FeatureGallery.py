@@ -0,0 +1,84 @@
+import heapq
+
+import numpy as np
+
+
+class FeatureGallery:
+    """ReID galleries of every track in one (capacity, nn_budget, dim) block.
+
+    Each track owns a slot: a fixed (nn_budget, dim) float32 ring buffer of
+    L2-normalised embeddings plus a valid count. Rows are normalised once on
+    append, so distances() is one matmul over the filled rows of the block
+    with nothing renormalised per frame. Slots are reused lowest-first to
+    keep the block compact.
+    """
+
+    def __init__(self, nn_budget: int, capacity: int = 64):
+        self.budget = max(1, int(nn_budget))
+        self.vectors = None
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.heads = np.zeros(capacity, dtype=np.int32)
+        self._free = list(range(capacity))
+
+    def allocate(self) -> int:
+        if not self._free:
+            self._grow()
+        slot = heapq.heappop(self._free)
+        self.counts[slot] = 0
+        self.heads[slot] = 0
+        return slot
+
+    def release(self, slot: int):
+        self.counts[slot] = 0
+        heapq.heappush(self._free, slot)
+
+    def _grow(self):
+        old = len(self.counts)
+        self.counts = np.concatenate([self.counts, np.zeros(old, dtype=np.int32)])
+        self.heads = np.concatenate([self.heads, np.zeros(old, dtype=np.int32)])
+        if self.vectors is not None:
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+        for slot in range(old, 2 * old):
+            heapq.heappush(self._free, slot)
+
+    def append(self, slot: int, feature: np.ndarray):
+        feature = np.asarray(feature, dtype=np.float32).ravel()
+        if self.vectors is None:
+            self.vectors = np.zeros((len(self.counts), self.budget, len(feature)), dtype=np.float32)
+        head = self.heads[slot]
+        np.divide(feature, np.linalg.norm(feature) + 1e-6, out=self.vectors[slot, head])
+        self.heads[slot] = (head + 1) % self.budget
+        self.counts[slot] = min(self.counts[slot] + 1, self.budget)
+
+    def rows(self, slot: int) -> np.ndarray:
+        """The slot's valid normalised embeddings (ring order, not age order)."""
+        if self.vectors is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.vectors[slot, :self.counts[slot]]
+
+    def distances(self, slots, features) -> np.ndarray:
+        """1 - best cosine similarity of each slot's gallery to each feature.
+
+        Slots with an empty gallery get 1.0, as does everything when there
+        are no features.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        dist = np.ones((len(slots), 0 if features is None else len(features)), dtype=float)
+        if self.vectors is None or dist.size == 0:
+            return dist
+        feats = np.asarray(features, dtype=np.float32)
+        feats = feats / (np.linalg.norm(feats, axis=1, keepdims=True) + 1e-6)
+
+        counts = self.counts[slots]
+        filled = counts > 0
+        if not filled.any():
+            return dist
+        # the filled rows of every slot, gathered slot after slot, go through
+        # one matmul; each slot's best match is then a max over its segment
+        counts = counts[filled]
+        starts = np.cumsum(counts) - counts
+        flat = self.vectors.reshape(-1, self.vectors.shape[2])
+        rows = np.repeat(slots[filled] * self.budget - starts, counts) + np.arange(counts.sum())
+        sims = np.take(flat, rows, axis=0) @ feats.T
+        dist[filled] = 1.0 - np.maximum.reduceat(sims, starts, axis=0)
+        return dist
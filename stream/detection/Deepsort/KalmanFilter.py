@@ -1,60 +1,104 @@
+import heapq
+
 import numpy as np
 
-class KalmanFilter:
-    def __init__(self, initial_state):
-        # state: [x, y, vx, vy]
-        self.x = np.array(initial_state, dtype=float).reshape((4, 1))
-        self.P = np.eye(4) * 10.0
-        # F will be rebuilt on each predict to include dt
-        self.F = np.eye(4, dtype=float)
-        self.H = np.array([[1, 0, 0, 0],
-                           [0, 1, 0, 0]], dtype=float)
+class BatchKalmanFilter:
+    """Constant-velocity Kalman filter of many tracks at once.
+
+    The state is [x, y, vx, vy] and the position is measured. States live
+    in one (capacity, 4) array and covariances in one (capacity, 4, 4)
+    array. Each track holds a KalmanSlot into them, and the tracker predicts
+    or updates whole subsets of slots in a single vectorised step. Slots are
+    reused lowest-first.
+    """
+
+    H = np.array([[1, 0, 0, 0],
+                  [0, 1, 0, 0]], dtype=float)
+
+    def __init__(self, capacity: int = 64):
+        self.x = np.zeros((capacity, 4), dtype=float)
+        self.P = np.zeros((capacity, 4, 4), dtype=float)
         self.R = np.eye(2) * 1.0
         self.Q = np.eye(4) * 0.01
+        self._free = list(range(capacity))
 
-    def predict(self):
+    def track(self, initial_state) -> "KalmanSlot":
+        if not self._free:
+            self._grow()
+        slot = heapq.heappop(self._free)
+        self.x[slot] = np.asarray(initial_state, dtype=float).reshape(4)
+        self.P[slot] = np.eye(4) * 10.0
+        return KalmanSlot(self, slot)
 
-        self.F = np.array([
-            [1, 0, 1, 0],
-            [0, 1, 0, 1],
-            [0, 0, 1, 0],
-            [0, 0, 0, 1]
-        ], dtype=float)
+    def release(self, slot: int):
+        heapq.heappush(self._free, slot)
 
-        self.x = self.F @ self.x
-        self.P = self.F @ self.P @ self.F.T + self.Q
-        return self.x
+    def _grow(self):
+        old = len(self.x)
+        self.x = np.concatenate([self.x, np.zeros_like(self.x)])
+        self.P = np.concatenate([self.P, np.zeros_like(self.P)])
+        for slot in range(old, 2 * old):
+            heapq.heappush(self._free, slot)
 
-    def predict_with_dt(self, dt):
+    def predict(self, slots, dt: float) -> np.ndarray:
+        slots = np.asarray(slots, dtype=np.intp)
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        self.x[slots] = self.x[slots] @ F.T
+        self.P[slots] = F @ self.P[slots] @ F.T + self.Q
+        return self.x[slots]
+
+    def update(self, slots, measurements) -> np.ndarray:
+        slots = np.asarray(slots, dtype=np.intp)
+        z = np.asarray(measurements, dtype=float).reshape(-1, 2)
+        x, P = self.x[slots], self.P[slots]
+        # H picks the position, so H P H^T and P H^T are slices of P
+        S = P[:, :2, :2] + self.R
+        K = P[:, :, :2] @ np.linalg.inv(S)
+        self.x[slots] = x + (K @ (z - x[:, :2])[..., None])[..., 0]
+        self.P[slots] = (np.eye(4) - K @ self.H) @ P
+        return self.x[slots]
+
+    def gating_distance(self, slots, points) -> np.ndarray:
+        """Squared Mahalanobis distance (N, M) of points (M, 2) from each slot's position."""
+        slots = np.asarray(slots, dtype=np.intp)
+        inv_S = np.linalg.inv(self.P[slots, :2, :2] + self.R)
+        d = np.asarray(points, dtype=float).reshape(1, -1, 2) - self.x[slots, None, :2]
+        return np.einsum("nmi,nij,nmj->nm", d, inv_S, d)
 
-        self.F = np.array([
-            [1, 0, dt, 0],
-            [0, 1, 0, dt],
-            [0, 0, 1,  0],
-            [0, 0, 0,  1]
-        ], dtype=float)
 
-        self.x = self.F @ self.x
-        self.P = self.F @ self.P @ self.F.T + self.Q
+class KalmanSlot:
+    """One track's view of a BatchKalmanFilter, with a single-filter interface."""
+
+    __slots__ = ("bank", "slot")
+
+    def __init__(self, bank: BatchKalmanFilter, slot: int):
+        self.bank = bank
+        self.slot = slot
+
+    @property
+    def x(self) -> np.ndarray:
+        # (4, 1) view; item writes go straight into the batch
+        return self.bank.x[self.slot].reshape(4, 1)
+
+    @x.setter
+    def x(self, value):
+        self.bank.x[self.slot] = np.asarray(value, dtype=float).reshape(4)
+
+    @property
+    def P(self) -> np.ndarray:
+        return self.bank.P[self.slot]
+
+    def predict(self):
+        return self.predict_with_dt(1.0)
+
+    def predict_with_dt(self, dt):
+        self.bank.predict([self.slot], dt)
         return self.x
 
     def update(self, measurement):
-        z = np.array(measurement, dtype=float).reshape((2, 1))
-        y = z - self.H @ self.x
-        S = self.H @ self.P @ self.H.T + self.R
-        K = self.P @ self.H.T @ np.linalg.inv(S)
-        self.x = self.x + K @ y
-        I = np.eye(self.F.shape[0])
-        self.P = (I - K @ self.H) @ self.P
+        self.bank.update([self.slot], measurement)
         return self.x
 
-    def gating_distance(self, dets):
-        x = self.x[:2].reshape((2,))
-        S = self.H @ self.P @ self.H.T + self.R
-        invS = np.linalg.inv(S)
-        dists = []
-        for det in dets:
-            y = np.array(det).reshape((2,)) - x  # (2,)
-            d = float(np.dot(np.dot(y.T, invS), y))
-            dists.append(d)
-        return np.array(dists)
\ No newline at end of file
+    def release(self):
+        self.bank.release(self.slot)
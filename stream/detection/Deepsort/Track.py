@@ -1,7 +1,8 @@
 from collections import deque
-from typing import List, Tuple, Optional
+from typing import Tuple, Optional
 import numpy as np
-from stream.detection.Deepsort.KalmanFilter import KalmanFilter
+from stream.detection.Deepsort.FeatureGallery import FeatureGallery
+from stream.detection.Deepsort.KalmanFilter import BatchKalmanFilter
 
 class Track:
     def __init__(
@@ -12,19 +13,27 @@ class Track:
         feature: Optional[np.ndarray] = None,
         nn_budget: int = 100,
         velocity_history_size: int = 5,
+        gallery: Optional[FeatureGallery] = None,
+        kalman: Optional[BatchKalmanFilter] = None,
     ):
         self.track_id = track_id
         self.bbox = bbox
         self.centroid = calibrated_centroid
         self.age = 1
         self.time_since_update = 0
-        self.kalman_filter = KalmanFilter(
+        # a slot in the tracker's batched filter, or a private one
+        kalman = kalman if kalman is not None else BatchKalmanFilter(capacity=1)
+        self.kalman_filter = kalman.track(
             [calibrated_centroid[0], calibrated_centroid[1], 0.0, 0.0]
         )
         self.last_timestamp: Optional[float] = None
-        self.feature_gallery: deque[np.ndarray] = deque(maxlen=nn_budget)
+        # a slot in the tracker's shared gallery, or a private one
+        self.gallery = gallery if gallery is not None else FeatureGallery(nn_budget, capacity=1)
+        self.gallery_slot = self.gallery.allocate()
         if feature is not None:
-            self.feature_gallery.append(feature.astype(np.float32))
+            self.gallery.append(self.gallery_slot, feature)
+        # matches in a row without an embedding (lazy appearance mode)
+        self.frames_since_feature = 0
         self.motion_distance: Optional[float] = None
         self.appearance_distance: Optional[float] = None
         self.velocity_history: deque[Tuple[float, float]] = deque(maxlen=velocity_history_size)
@@ -48,13 +57,21 @@ class Track:
 
         return self.centroid
 
+    def predicted_point(self, dt: float) -> Tuple[float, float]:
+        """Where the filter expects the track dt seconds on, without stepping it."""
+        x = self.kalman_filter.x
+        return float(x[0, 0] + x[2, 0] * dt), float(x[1, 0] + x[3, 0] * dt)
+
     def update(
         self,
         bbox: Tuple[int, int, int, int, int],
         calibrated_centroid: Tuple[float, float],
         feature: Optional[np.ndarray] = None,
         timestamp: Optional[float] = None,
+        update_filter: bool = True,
     ):
+        # update_filter=False when the tracker already updated the filter
+        # for this measurement in a batch
         if self.prev_measure_timestamp is not None and timestamp is not None:
             dt = timestamp - self.prev_measure_timestamp
             if dt > 0:
@@ -64,7 +81,8 @@ class Track:
 
         self.bbox = bbox
         self.centroid = calibrated_centroid
-        self.kalman_filter.update(calibrated_centroid)
+        if update_filter:
+            self.kalman_filter.update(calibrated_centroid)
 
         if self.velocity_history:
             avg_vx = sum(v[0] for v in self.velocity_history) / len(self.velocity_history)
@@ -73,7 +91,10 @@ class Track:
             self.kalman_filter.x[3, 0] = avg_vy
 
         if feature is not None:
-            self.feature_gallery.append(feature.astype(np.float32))
+            self.gallery.append(self.gallery_slot, feature)
+            self.frames_since_feature = 0
+        else:
+            self.frames_since_feature += 1
 
         self.time_since_update = 0
         self.age += 1
@@ -83,5 +104,9 @@ class Track:
             self.prev_measured_centroid = calibrated_centroid
             self.last_timestamp = timestamp
 
-    def get_gallery(self) -> List[np.ndarray]:
-        return list(self.feature_gallery)
+    def get_gallery(self) -> np.ndarray:
+        return self.gallery.rows(self.gallery_slot)
+
+    def release(self):
+        self.gallery.release(self.gallery_slot)
+        self.kalman_filter.release()
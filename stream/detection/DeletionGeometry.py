@@ -0,0 +1,117 @@
+import numpy as np
+
+from stream.detection.DetectionBatch import PERSON_CLASS_IDX
+from utils.RegionManager import RegionManager
+
+LINE_REGION_TYPES = ("deletion_line", "pedestrian_deletion_line")
+EDGE_SAMPLES = 5
+
+
+def _segments(polylines):
+    segs = []
+    for pts in polylines:
+        pts = np.asarray(pts, dtype=np.float32).reshape(-1, 2)
+        if len(pts) >= 2:
+            segs.append(np.hstack([pts[:-1], pts[1:]]))
+    return np.concatenate(segs) if segs else np.empty((0, 4), dtype=np.float32)
+
+
+def _bbox_edges(boxes):
+    # (N, 4, 4): top, right, bottom, left as (x1, y1, x2, y2) per edge
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    return np.stack([
+        np.stack([x1, y1, x2, y1], axis=1),
+        np.stack([x2, y1, x2, y2], axis=1),
+        np.stack([x2, y2, x1, y2], axis=1),
+        np.stack([x1, y2, x1, y1], axis=1),
+    ], axis=1)
+
+
+def _ccw(ax, ay, bx, by, cx, cy):
+    return (cy - ay) * (bx - ax) > (by - ay) * (cx - ax)
+
+
+def segments_intersect(a, b):
+    """Pairwise proper intersection of segment arrays a (..., 4) and b (..., 4)."""
+    a1x, a1y, a2x, a2y = np.moveaxis(a, -1, 0)
+    b1x, b1y, b2x, b2y = np.moveaxis(b, -1, 0)
+    return (
+        (_ccw(a1x, a1y, b1x, b1y, b2x, b2y) != _ccw(a2x, a2y, b1x, b1y, b2x, b2y))
+        & (_ccw(a1x, a1y, a2x, a2y, b1x, b1y) != _ccw(a1x, a1y, a2x, a2y, b2x, b2y))
+    )
+
+
+def point_segment_distance(points, segs):
+    """Distance from points (..., 2) to segments (..., 4), broadcast together."""
+    px, py = points[..., 0], points[..., 1]
+    x1, y1, x2, y2 = np.moveaxis(segs, -1, 0)
+    dx, dy = x2 - x1, y2 - y1
+    len2 = dx * dx + dy * dy
+    t = np.where(len2 > 0, ((px - x1) * dx + (py - y1) * dy) / np.where(len2 > 0, len2, 1.0), 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def points_in_polygon(points, polygon):
+    """Even-odd test of points (N, 2) against one polygon (M, 2)."""
+    poly = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+    if len(poly) < 3 or len(points) == 0:
+        return np.zeros(len(points), dtype=bool)
+    xi, yi = poly[:, 0], poly[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    px, py = points[:, 0:1], points[:, 1:2]
+    crosses = (yi > py) != (yj > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at = (xj - xi) * (py - yi) / (yj - yi) + xi
+    return np.count_nonzero(crosses & (px < x_at), axis=1) % 2 == 1
+
+
+class DeletionGeometry:
+    """Deletion lines and areas of one region file, tested in a single pass.
+
+    A bbox hits a line when one of its edges crosses a segment or a point
+    sampled along its edges comes within ``threshold`` pixels of one;
+    ``pedestrian_deletion_line`` only applies to persons. A bbox is inside a
+    deletion area when its bottom-centre (ground contact) point is.
+    """
+
+    def __init__(self, editor: RegionManager, threshold: float = 6.0):
+        self.threshold = threshold
+        lines, person_only = [], []
+        for rtype in LINE_REGION_TYPES:
+            segs = _segments(l["points"] for l in editor.other_regions.get(rtype, []))
+            lines.append(segs)
+            person_only.append(np.full(len(segs), rtype == "pedestrian_deletion_line"))
+        self.segments = np.concatenate(lines)
+        self.person_only = np.concatenate(person_only)
+        self.areas = [a["points"] for a in editor.other_regions.get("deletion_area", [])]
+
+    def __bool__(self):
+        return bool(len(self.segments) or self.areas)
+
+    def hits(self, boxes, classes) -> np.ndarray:
+        """Boolean mask over boxes (N, 4) of the ones to retire."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        classes = np.asarray(classes).reshape(-1)
+        hit = np.zeros(len(boxes), dtype=bool)
+        if not len(boxes):
+            return hit
+
+        if len(self.segments):
+            edges = _bbox_edges(boxes)
+            segs = self.segments[None, None]
+            crossed = segments_intersect(edges[:, :, None], segs).any(axis=1)
+
+            t = np.linspace(0.0, 1.0, EDGE_SAMPLES, dtype=np.float32)[:, None]
+            samples = edges[:, :, None, :2] + t * (edges[:, :, None, 2:] - edges[:, :, None, :2])
+            samples = samples.reshape(len(boxes), -1, 2)
+            near = (point_segment_distance(samples[:, :, None], segs[0]) <= self.threshold).any(axis=1)
+
+            applies = ~self.person_only[None] | (classes[:, None] == PERSON_CLASS_IDX)
+            hit |= ((crossed | near) & applies).any(axis=1)
+
+        if self.areas:
+            ground = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2.0, boxes[:, 3]], axis=1)
+            for area in self.areas:
+                hit |= points_in_polygon(ground, area)
+        return hit
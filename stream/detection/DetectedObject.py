@@ -21,6 +21,22 @@ class DetectedObject:
         self.bbox = bbox
         self.surface_point = surface_point
 
+    @classmethod
+    def from_record(cls, rec):
+        """View of one DetectionBatch row, for the GUI."""
+        x1, y1, x2, y2 = rec["bbox"]
+        obj = cls(
+            int(rec["track_id"]),
+            cls.CLASS_NAMES.get(int(rec["cls"]), "unknown"),
+            (int(x1), int(y1), int(x2), int(y2)),
+            (float(rec["point"][0]), float(rec["point"][1]))
+        )
+        obj.confidence = float(rec["conf"])
+        motion, app = float(rec["motion_dist"]), float(rec["app_dist"])
+        obj.motion_distance = None if motion != motion else motion
+        obj.appearance_distance = None if app != app else app
+        return obj
+
     def update_bbox(self, new_bbox):
         self.bbox = new_bbox
 
@@ -0,0 +1,99 @@
+import numpy as np
+
+from stream.detection.DetectedObject import DetectedObject
+
+PERSON_CLASS_IDX = 0
+
+# one row per detection / track. ``ground`` is the bbox bottom-centre in image
+# pixels, ``point`` the tracker's point (the BEV point when a homography is
+# set, the bbox centre otherwise); ``track_id`` is -1 until the tracker assigns
+# one and the distances are NaN until the track is first matched
+DETECTION_DTYPE = np.dtype([
+    ("bbox",        np.float32, (4,)),
+    ("cls",         np.int32),
+    ("conf",        np.float32),
+    ("ground",      np.float32, (2,)),
+    ("point",       np.float32, (2,)),
+    ("track_id",    np.int64),
+    ("motion_dist", np.float32),
+    ("app_dist",    np.float32),
+])
+
+
+class DetectionBatch:
+    """Columnar detections or tracks of one frame, backed by a structured array.
+
+    This is what moves between the detector, tracker, MotWriterThread and
+    GlobalState; DetectedObject instances are only built by objects() for the
+    GUI.
+    """
+
+    __slots__ = ("records",)
+
+    def __init__(self, records: np.ndarray = None):
+        self.records = records if records is not None else np.empty(0, dtype=DETECTION_DTYPE)
+
+    @classmethod
+    def empty(cls, n: int = 0):
+        rec = np.zeros(n, dtype=DETECTION_DTYPE)
+        rec["track_id"] = -1
+        rec["motion_dist"] = np.nan
+        rec["app_dist"] = np.nan
+        return cls(rec)
+
+    @classmethod
+    def from_arrays(cls, boxes, class_ids, confidences):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        batch = cls.empty(len(boxes))
+        rec = batch.records
+        rec["bbox"] = boxes
+        rec["cls"] = class_ids
+        rec["conf"] = confidences
+        rec["ground"][:, 0] = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        rec["ground"][:, 1] = boxes[:, 3]
+        return batch
+
+    @classmethod
+    def concatenate(cls, batches):
+        batches = [b.records for b in batches if len(b)]
+        if not batches:
+            return cls.empty()
+        return cls(np.concatenate(batches))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        # masks and index arrays give a new batch, like indexing the array
+        return DetectionBatch(np.atleast_1d(self.records[index]))
+
+    @property
+    def bbox(self):
+        return self.records["bbox"]
+
+    @property
+    def cls(self):
+        return self.records["cls"]
+
+    @property
+    def conf(self):
+        return self.records["conf"]
+
+    @property
+    def ground(self):
+        return self.records["ground"]
+
+    @property
+    def point(self):
+        return self.records["point"]
+
+    @property
+    def track_id(self):
+        return self.records["track_id"]
+
+    def rows(self) -> np.ndarray:
+        """(N, 6) float array of x1, y1, x2, y2, cls, conf."""
+        return np.column_stack([self.bbox, self.cls, self.conf]).astype(np.float32)
+
+    def objects(self):
+        return [DetectedObject.from_record(r) for r in self.records]
@@ -0,0 +1,114 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from stream.detection.DetectionBatch import DetectionBatch
+
+CACHE_VERSION = 1
+CHUNK_FRAMES = 256
+COMPLETE_MARKER = "complete.json"
+HASH_SAMPLE_BYTES = 4 << 20
+
+
+def video_hash(path: str) -> str:
+    """Content key of a video file: its size plus the first and last 4 MiB.
+
+    Reading multi-gigabyte recordings end to end on every start would cost
+    more than it saves; the head and tail already differ between clips.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(HASH_SAMPLE_BYTES))
+        if size > HASH_SAMPLE_BYTES:
+            f.seek(max(HASH_SAMPLE_BYTES, size - HASH_SAMPLE_BYTES))
+            h.update(f.read(HASH_SAMPLE_BYTES))
+    return h.hexdigest()[:16]
+
+
+def config_hash(settings: dict) -> str:
+    blob = json.dumps({"version": CACHE_VERSION, **settings}, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def _offsets(parts):
+    return np.cumsum([0] + [len(p) for p in parts]).astype(np.int64)
+
+
+class DetectionCache:
+    """Per-frame detections, ReID embeddings and tracks of one video on disk.
+
+    Entries live in ``<root>/<video hash>_<config hash>/`` as compressed
+    chunks of CHUNK_FRAMES frames, keyed by source frame index. A cache is
+    only replayed once finish() has written its completion marker; an
+    unfinished one is thrown away and recorded again.
+    """
+
+    def __init__(self, root: str, video_path: str, settings: dict):
+        self.path = os.path.join(root, f"{video_hash(video_path)}_{config_hash(settings)}")
+        self.complete = os.path.exists(os.path.join(self.path, COMPLETE_MARKER))
+        self._pending = []
+        self._chunk = 0
+        if not self.complete:
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.makedirs(self.path, exist_ok=True)
+
+    def record(self, frame_index, capture_time, detections: DetectionBatch,
+               features, tracks: DetectionBatch, removed_ids):
+        if self.complete:
+            return
+        if features is None:
+            features = np.zeros((len(detections), 0), dtype=np.float32)
+        self._pending.append((
+            frame_index, capture_time, detections.records,
+            np.asarray(features, dtype=np.float32), tracks.records,
+            np.asarray(removed_ids, dtype=np.int64)
+        ))
+        if len(self._pending) >= CHUNK_FRAMES:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        index, times, dets, feats, tracks, removed = zip(*self._pending)
+        dim = max((f.shape[1] for f in feats), default=0)
+        feats = [f if f.shape[1] == dim else np.zeros((len(f), dim), np.float32) for f in feats]
+        np.savez_compressed(
+            os.path.join(self.path, f"chunk_{self._chunk:05d}.npz"),
+            frame_index=np.asarray(index, dtype=np.int64),
+            capture_time=np.asarray(times, dtype=np.float64),
+            det_offsets=_offsets(dets),
+            detections=np.concatenate(dets),
+            features=np.concatenate(feats),
+            track_offsets=_offsets(tracks),
+            tracks=np.concatenate(tracks),
+            removed_offsets=_offsets(removed),
+            removed=np.concatenate(removed),
+        )
+        self._chunk += 1
+        self._pending = []
+
+    def finish(self):
+        if self.complete:
+            return
+        self._flush()
+        with open(os.path.join(self.path, COMPLETE_MARKER), "w") as f:
+            json.dump({"version": CACHE_VERSION, "chunks": self._chunk}, f)
+        self.complete = True
+
+    def frames(self):
+        """Yield (frame_index, capture_time, tracks, removed_ids) in order."""
+        for chunk in sorted(glob.glob(os.path.join(self.path, "chunk_*.npz"))):
+            with np.load(chunk) as data:
+                t_off, r_off = data["track_offsets"], data["removed_offsets"]
+                tracks, removed = data["tracks"], data["removed"]
+                for i, (idx, ts) in enumerate(zip(data["frame_index"], data["capture_time"])):
+                    yield (
+                        int(idx), float(ts),
+                        DetectionBatch(tracks[t_off[i]:t_off[i + 1]]),
+                        removed[r_off[i]:r_off[i + 1]].tolist(),
+                    )
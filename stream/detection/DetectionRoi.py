@@ -0,0 +1,53 @@
+import numpy as np
+
+from utils.RegionManager import RegionManager
+
+ROI_REGION_TYPES = ("sidewalk", "road")
+
+
+def union_roi(editor: RegionManager, padding: int = 0):
+    """Bounding box (x1, y1, x2, y2) of every region detections matter in.
+
+    Covers all crosswalk pack polygons plus sidewalk and road regions; returns
+    None when nothing is annotated, in which case the whole frame is used.
+    """
+    polygons = []
+    for pack in editor.crosswalk_packs:
+        if pack.crosswalk:
+            polygons.append(pack.crosswalk.get("points", []))
+        polygons.extend(p.get("points", []) for p in pack.pedes_wait)
+        polygons.extend(p.get("points", []) for p in pack.car_wait)
+    for rtype in ROI_REGION_TYPES:
+        polygons.extend(p.get("points", []) for p in editor.other_regions.get(rtype, []))
+
+    points = [pt for poly in polygons for pt in poly]
+    if not points:
+        return None
+    arr = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    x1, y1 = np.floor(arr.min(axis=0)) - padding
+    x2, y2 = np.ceil(arr.max(axis=0)) + padding
+    return int(max(0, x1)), int(max(0, y1)), int(x2), int(y2)
+
+
+def split_tiles(roi, tiles: int, overlap: int = 32):
+    """Cut the roi into ``tiles`` overlapping strips along its longer side."""
+    if roi is None or tiles <= 1:
+        return [roi] if roi is not None else []
+    x1, y1, x2, y2 = roi
+    horizontal = (x2 - x1) >= (y2 - y1)
+    start, end = (x1, x2) if horizontal else (y1, y2)
+    step = (end - start) / tiles
+    out = []
+    for i in range(tiles):
+        a = int(max(start, start + i * step - overlap))
+        b = int(min(end, start + (i + 1) * step + overlap))
+        out.append((a, y1, b, y2) if horizontal else (x1, a, x2, b))
+    return out
+
+
+def clip_roi(roi, frame_shape):
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = roi
+    x1, y1 = min(max(0, x1), w - 1), min(max(0, y1), h - 1)
+    x2, y2 = min(max(x1 + 1, x2), w), min(max(y1 + 1, y2), h)
+    return x1, y1, x2, y2
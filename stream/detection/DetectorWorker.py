@@ -0,0 +1,238 @@
+import multiprocessing as mp
+import threading
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from stream.detection.DetectionBatch import DetectionBatch
+from stream.detection.FramePyramid import LetterboxTile
+
+
+def _address(buf) -> int:
+    return np.frombuffer(buf, dtype=np.uint8, count=1).__array_interface__["data"][0]
+
+
+class SharedSlots:
+    """Named shared-memory buffers the worker process attaches to by name.
+
+    A slot is grown by replacing its segment; the old one is unlinked right
+    away but only unmapped on close(), since views into it may still exist.
+    """
+
+    def __init__(self):
+        self._segments = {}
+        self._retired  = []
+
+    def array(self, key, shape) -> np.ndarray:
+        nbytes = int(np.prod(shape))
+        shm = self._segments.get(key)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.unlink()
+                self._retired.append(shm)
+            shm = SharedMemory(create=True, size=max(1, nbytes))
+            self._segments[key] = shm
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+    def segment_of(self, arr: np.ndarray):
+        """(slot key, segment name) when ``arr`` is a whole slot view, None otherwise."""
+        if not arr.flags.c_contiguous:
+            return None
+        addr = arr.__array_interface__["data"][0]
+        for key, shm in self._segments.items():
+            if addr == _address(shm.buf) and arr.nbytes <= shm.size:
+                return key, shm.name
+        return None
+
+    def close(self):
+        for shm in list(self._segments.values()) + self._retired:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+            if shm in self._retired:
+                continue
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments.clear()
+        self._retired.clear()
+
+
+def _worker_main(conn, yolo_cfg, reid_device, reid_paths):
+    try:
+        # models are imported and loaded here, in the worker, never in the client
+        from stream.detection.YoloDetector import YoloDetector
+        from stream.detection.Deepsort.CNNFeatureExtractor import CNNFeatureExtractor
+
+        detector = YoloDetector(yolo_config=yolo_cfg)
+        extractors = {
+            kind: CNNFeatureExtractor.shared(reid_device, path) for kind, path in reid_paths.items()
+        }
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    conn.send(("ready", None))
+
+    attached = {}
+    retired = []
+
+    def view(key, name, shape):
+        shm = attached.get(key)
+        if shm is None or shm.name != name:
+            if shm is not None:
+                # the client grew this slot into a new segment; the old one
+                # is already unlinked, only our mapping is left
+                retired.append(shm)
+                _close_all(retired)
+            # spawned children share the client's resource tracker, which
+            # already knows the segment; the client unlinks it
+            shm = attached[key] = SharedMemory(name=name)
+        return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        op = msg[0]
+        if op == "stop":
+            break
+        try:
+            if op == "detect":
+                frames = [
+                    [LetterboxTile(view(key, name, shape), scale, pad, offset, source_shape)
+                     for (key, name), shape, scale, pad, offset, source_shape in tiles]
+                    for tiles in msg[1]
+                ]
+                if len(frames) == 1:
+                    out = [detector.run_tiles(frames[0])]
+                else:
+                    out = detector.run_batch(frames)
+                conn.send(("ok", [b.records for b in out]))
+            elif op == "reid":
+                _, kind, (key, name), shape, boxes = msg
+                conn.send(("ok", extractors[kind].extract_features_batch(view(key, name, shape), boxes)))
+            else:
+                conn.send(("error", f"unknown request {op!r}"))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+    _close_all(retired + list(attached.values()))
+
+
+def _close_all(segments):
+    # a segment still viewed by a live array stays in the list for next time
+    for shm in list(segments):
+        try:
+            shm.close()
+        except BufferError:
+            continue
+        segments.remove(shm)
+
+
+class DetectorWorker:
+    """YOLO and both ReID extractors in a separate (spawned) process.
+
+    Frames and tiles travel through SharedSlots; only segment names, shapes,
+    tile geometry and the resulting arrays go over the pipe, so the client
+    side holds no model and no GIL-heavy inference.
+    """
+
+    def __init__(self, yolo_cfg, reid_device, reid_paths):
+        ctx = mp.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._lock = threading.Lock()
+        self.slots = SharedSlots()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child, yolo_cfg, reid_device, reid_paths),
+            name="DetectorWorker",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        # fail here, like the in-process detector would, not on the first frame
+        try:
+            self._wait_ready()
+        except (RuntimeError, EOFError, ConnectionResetError) as e:
+            self.close()
+            if isinstance(e, RuntimeError):
+                raise
+            raise RuntimeError("Detector worker exited during start-up")
+
+    def _wait_ready(self):
+        status, payload = self._conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"Detector worker failed to start: {payload}")
+
+    def call(self, *msg):
+        with self._lock:
+            try:
+                self._conn.send(msg)
+                status, payload = self._conn.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError):
+                raise RuntimeError("Detector worker exited")
+        if status != "ok":
+            raise RuntimeError(f"Detector worker: {payload}")
+        return payload
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self._conn.close()
+            self.slots.close()
+
+
+class RemoteDetector:
+    """YoloDetector.run_tiles()/run_batch() served by a DetectorWorker."""
+
+    def __init__(self, worker: DetectorWorker):
+        self.worker = worker
+
+    def _describe(self, frames_tiles):
+        out, n = [], 0
+        for tiles in frames_tiles:
+            desc = []
+            for tile in tiles:
+                buf = self.worker.slots.array(("tile", n), tile.image.shape)
+                np.copyto(buf, tile.image)
+                desc.append((
+                    self.worker.slots.segment_of(buf), tile.image.shape,
+                    tile.scale, tile.pad, tile.offset, tile.source_shape
+                ))
+                n += 1
+            out.append(desc)
+        return out
+
+    def run_tiles(self, tiles):
+        return self.run_batch([tiles])[0]
+
+    def run_batch(self, frames_tiles):
+        records = self.worker.call("detect", self._describe(frames_tiles))
+        return [DetectionBatch(r) for r in records]
+
+
+class RemoteFeatureExtractor:
+    """CNNFeatureExtractor.extract_features_batch() served by a DetectorWorker."""
+
+    def __init__(self, worker: DetectorWorker, kind: str):
+        self.worker = worker
+        self.kind = kind
+
+    def extract_features_batch(self, frame: np.ndarray, bboxes) -> np.ndarray:
+        segment = self.worker.slots.segment_of(frame)
+        if segment is None:
+            # not one of our slots (DetectionThread masks straight into one)
+            buf = self.worker.slots.array(("reid_frame",), frame.shape)
+            np.copyto(buf, frame)
+            segment = self.worker.slots.segment_of(buf)
+        boxes = np.asarray(bboxes, dtype=np.int32).reshape(-1, 4)
+        return self.worker.call("reid", self.kind, segment, frame.shape, boxes)
@@ -0,0 +1,112 @@
+import math
+
+import cv2
+import numpy as np
+
+from stream.FrameRing import FrameRef
+from stream.detection.DetectionRoi import clip_roi
+
+LETTERBOX_COLOR = 114
+
+
+class LetterboxTile:
+    """Detector input cut from a source frame: RGB, letterboxed, stride aligned.
+
+    ``offset`` is the top-left corner of the cut in source pixels, ``scale``
+    the resize factor and ``pad`` the letterbox border, so box coordinates go
+    back to the source frame with to_source() and nowhere else.
+    """
+
+    def __init__(self, image, scale, pad, offset, source_shape):
+        self.image = image
+        self.scale = scale
+        self.pad = pad
+        self.offset = offset
+        self.source_shape = source_shape
+
+    @property
+    def key(self):
+        # tiles with the same key share geometry, masks can be cached on it
+        return self.image.shape, self.scale, self.pad, self.offset
+
+    def to_source(self, boxes: np.ndarray) -> np.ndarray:
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        px, py = self.pad
+        ox, oy = self.offset
+        out = (boxes - (px, py, px, py)) / self.scale + (ox, oy, ox, oy)
+        h, w = self.source_shape[:2]
+        np.clip(out[:, 0::2], 0, w - 1, out=out[:, 0::2])
+        np.clip(out[:, 1::2], 0, h - 1, out=out[:, 1::2])
+        return out
+
+    def to_tile(self, points) -> np.ndarray:
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        return (pts - self.offset) * self.scale + self.pad
+
+
+def letterbox(src: np.ndarray, imgsz: int, offset=(0, 0), source_shape=None,
+              stride: int = 32, max_scale: float = None, square: bool = False) -> LetterboxTile:
+    h, w = src.shape[:2]
+    r = min(imgsz / h, imgsz / w)
+    if max_scale is not None:
+        r = min(r, max_scale)
+    nw, nh = max(1, int(round(w * r))), max(1, int(round(h * r)))
+    if square:
+        # fixed imgsz x imgsz canvas, so tiles of any aspect batch together
+        out_w = out_h = int(math.ceil(imgsz / stride) * stride)
+    else:
+        out_w = int(math.ceil(nw / stride) * stride)
+        out_h = int(math.ceil(nh / stride) * stride)
+    px, py = (out_w - nw) // 2, (out_h - nh) // 2
+
+    out = np.full((out_h, out_w, 3), LETTERBOX_COLOR, dtype=np.uint8)
+    resized = cv2.resize(src, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    # BGR -> RGB happens here, on detection-sized pixels only
+    out[py:py + nh, px:px + nw] = resized[..., ::-1]
+    return LetterboxTile(
+        out, r, (px, py), offset,
+        source_shape if source_shape is not None else src.shape
+    )
+
+
+class FramePyramid:
+    """Everything DetectionThread needs from one sampled frame.
+
+    Built once in the producer: ``source`` is the full-resolution FrameRef
+    (blackout masking and ReID crops), ``tiles`` the detector inputs and
+    ``frame_index`` the position in the source video, when there is one.
+    """
+
+    def __init__(self, source: FrameRef, tiles, frame_index=None):
+        self.source = source
+        self.tiles = tiles
+        self.frame_index = frame_index
+
+    @classmethod
+    def build(cls, source: FrameRef, imgsz: int, rois=None, frame_index=None):
+        frame = source.frame
+        if not rois:
+            return cls(source, [letterbox(frame, imgsz)], frame_index)
+        tiles = []
+        for roi in rois:
+            x1, y1, x2, y2 = clip_roi(roi, frame.shape)
+            # crops are never upscaled: fewer pixels is the whole point
+            tiles.append(letterbox(
+                frame[y1:y2, x1:x2], imgsz, offset=(x1, y1),
+                source_shape=frame.shape, max_scale=1.0
+            ))
+        return cls(source, tiles, frame_index)
+
+    def release(self):
+        self.source.release()
+
+
+def display_image(ref: FrameRef, max_resolution) -> FrameRef:
+    """Return a ref sized for display; the source itself when it already fits."""
+    h, w = ref.shape[:2]
+    max_w, max_h = max_resolution
+    if w <= max_w and h <= max_h:
+        return ref.retain()
+    scale = min(max_w / w, max_h / h)
+    small = cv2.resize(ref.frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return FrameRef.wrap(small)
@@ -1,44 +1,158 @@
-import cv2
+import os
+import shutil
+import numpy as np
+import torch
+import torchvision
 import warnings
 from ultralytics import YOLO
 
+from stream.detection.DetectionBatch import DetectionBatch
+from utils.ModelRegistry import ModelRegistry
+
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_model_path(weights: str, backend: str) -> str:
+    """Where the converted model for ``weights`` is cached, next to the weights."""
+    stem, _ = os.path.splitext(weights)
+    if backend == "onnx":
+        return stem + ".onnx"
+    return stem + "_openvino_model"
+
+
+def export_model(weights: str, backend: str, imgsz: int) -> str:
+    """Export ``weights`` once for ``backend`` and return the cached model path.
+
+    Exports use dynamic input shapes so region crops and batches of any size
+    run on the same file.
+    """
+    target = exported_model_path(weights, backend)
+    if os.path.exists(target):
+        return target
+    print(f"Exporting {weights} for {backend}, this only happens once")
+    out = YOLO(weights).export(format=backend, imgsz=imgsz, dynamic=True)
+    # ultralytics may rename the weights (yolov5m -> yolov5mu), keep our name
+    if os.path.abspath(out) != os.path.abspath(target):
+        shutil.move(out, target)
+    return target
+
+
 class YoloDetector:
+    TILE_MERGE_IOU = 0.5
+
     def __init__(self, yolo_config):
 
         self.cfg = yolo_config
-        self.model = YOLO(self.cfg["version"])
-        self.model.to(self.cfg["device"])
+        self.backend = self.cfg.get("backend", "torch")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown yolo backend '{self.backend}', expected one of {BACKENDS}")
+
+        # exported runtimes run on the CPU and take host tensors
+        self.device = self.cfg["device"] if self.backend == "torch" else "cpu"
+        # the model is shared between streams, its predictor is not re-entrant
+        key = self.model_key(self.cfg)
+        self.model = ModelRegistry.instance().get(key, lambda: self.load_model(self.cfg))
+        self._model_lock = ModelRegistry.instance().inference_lock(key)
         self.imgsz          = self.cfg.get("imgsz")
         self.classes        = self.cfg.get("classes")
         self.conf_global    = self.cfg.get("conf")
         self.conf_per_class = self.cfg.get("conf_per_class")
 
-    def run(self, img):
+    @staticmethod
+    def model_key(yolo_config):
+        backend = yolo_config.get("backend", "torch")
+        device = yolo_config["device"] if backend == "torch" else "cpu"
+        return "yolo", yolo_config["version"], device, backend
+
+    @staticmethod
+    def load_model(yolo_config):
+        backend = yolo_config.get("backend", "torch")
+        imgsz = yolo_config.get("imgsz", 640)
+        if backend == "torch":
+            model = YOLO(yolo_config["version"])
+            model.to(yolo_config["device"])
+        else:
+            model = YOLO(export_model(yolo_config["version"], backend, imgsz), task="detect")
+        # first call sets up the predictor and, on GPU, the kernels
+        model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), imgsz=imgsz, verbose=False)
+        return model
 
-        frame = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = self.model(
-            frame,
-            classes=self.classes,
-            conf=self.conf_global,
-            imgsz=self.imgsz,
-            verbose=False
+    @classmethod
+    def preload(cls, yolo_config):
+        return ModelRegistry.instance().preload(
+            cls.model_key(yolo_config), lambda: cls.load_model(yolo_config)
         )
 
-        r = results[0]
-        boxes = r.boxes.xyxy.cpu().numpy()
-        class_ids = r.boxes.cls.cpu().numpy().astype(int)
-        confidences = r.boxes.conf.cpu().numpy()
-
-        detections = []
-        for box, cls, conf in zip(boxes, class_ids, confidences):
-            thr = self.conf_per_class.get(cls, self.conf_global)
-            if conf >= thr:
-                x1, y1, x2, y2 = box
-                detections.append((
-                    int(x1), int(y1), int(x2), int(y2),
-                    cls,
-                    float(conf)
-                ))
-        return detections
\ No newline at end of file
+    def run_tiles(self, tiles):
+        """Detect on letterboxed tiles from a FramePyramid, boxes in source pixels."""
+        return self._merge_tiles(tiles, self._predict_tiles(tiles))
+
+    def run_batch(self, frames_tiles):
+        """run_tiles() for several frames at once, one list of detections per frame.
+
+        Tiles of every frame go through a single _predict_tiles() call, so
+        frames with the same tile geometry share one batched model call.
+        """
+        flat = [tile for tiles in frames_tiles for tile in tiles]
+        results = self._predict_tiles(flat)
+        out, start = [], 0
+        for tiles in frames_tiles:
+            out.append(self._merge_tiles(tiles, results[start:start + len(tiles)]))
+            start += len(tiles)
+        return out
+
+    def _merge_tiles(self, tiles, results):
+        boxes, class_ids, confidences = [], [], []
+        for tile, r in zip(tiles, results):
+            boxes.append(tile.to_source(r.boxes.xyxy.cpu().numpy()))
+            class_ids.append(r.boxes.cls.cpu().numpy().astype(int))
+            confidences.append(r.boxes.conf.cpu().numpy())
+
+        boxes = np.concatenate(boxes).astype(np.float32)
+        class_ids = np.concatenate(class_ids)
+        confidences = np.concatenate(confidences)
+        if len(tiles) > 1 and len(boxes):
+            # objects in the overlap between tiles are found twice
+            keep = torchvision.ops.batched_nms(
+                torch.from_numpy(boxes),
+                torch.from_numpy(confidences.astype(np.float32)),
+                torch.from_numpy(class_ids),
+                self.TILE_MERGE_IOU
+            ).numpy()
+            boxes, class_ids, confidences = boxes[keep], class_ids[keep], confidences[keep]
+        return self._to_detections(boxes, class_ids, confidences)
+
+    def _predict_tiles(self, tiles):
+        # tiles are already RGB and stride aligned, so they go in as a tensor
+        # and ultralytics skips its own letterbox and colour conversion;
+        # tiles of equal shape share one batched call
+        results = [None] * len(tiles)
+        by_shape = {}
+        for i, tile in enumerate(tiles):
+            by_shape.setdefault(tile.image.shape, []).append(i)
+        for indices in by_shape.values():
+            batch = np.stack([tiles[i].image for i in indices])
+            tensor = torch.from_numpy(batch).to(self.device).permute(0, 3, 1, 2).float().div_(255.0)
+            with self._model_lock:
+                out = self.model(
+                    tensor,
+                    classes=self.classes,
+                    conf=self.conf_global,
+                    verbose=False
+                )
+            for i, r in zip(indices, out):
+                results[i] = r
+        return results
+
+    def _to_detections(self, boxes, class_ids, confidences):
+        confidences = np.asarray(confidences, dtype=np.float32)
+        class_ids = np.asarray(class_ids, dtype=np.int32)
+        thr = np.full(len(confidences), self.conf_global, dtype=np.float32)
+        for cls, cls_thr in (self.conf_per_class or {}).items():
+            thr[class_ids == int(cls)] = cls_thr
+        keep = confidences >= thr
+        # boxes were always handed on as whole pixels
+        boxes = np.trunc(np.asarray(boxes, dtype=np.float32).reshape(-1, 4)[keep])
+        return DetectionBatch.from_arrays(boxes, class_ids[keep], confidences[keep])
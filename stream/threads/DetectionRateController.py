@@ -0,0 +1,57 @@
+from threading import Lock
+
+
+class DetectionRateController:
+    """Adapts the producer's detection sampling interval to the detector's pace.
+
+    DetectionThread reports the inference and post-processing time of every
+    frame together with the detection queue depth; FrameProducerThread asks for
+    the current interval before sampling a frame. The interval follows the
+    smoothed processing time (plus some headroom) and backs off while frames
+    are waiting in the queue, always staying within [1/max_fps, 1/min_fps].
+    """
+
+    def __init__(
+        self,
+        detection_fps: float,
+        min_fps: float,
+        max_fps: float,
+        smoothing: float = 0.2,
+        headroom: float = 1.2,
+    ):
+        if min_fps is None or min_fps <= 0:
+            raise ValueError("min_detection_fps must be > 0")
+        if max_fps is None or max_fps < min_fps:
+            raise ValueError("max_detection_fps must be >= min_detection_fps")
+
+        self._lock        = Lock()
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self.smoothing    = smoothing
+        self.headroom     = headroom
+        self._interval    = self._clamp(1.0 / detection_fps)
+        self._busy_ema    = None
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def interval(self) -> float:
+        with self._lock:
+            return self._interval
+
+    def effective_fps(self) -> float:
+        return 1.0 / self.interval()
+
+    def report(self, inference_time: float, postproc_time: float, queue_depth: int):
+        busy = inference_time + postproc_time
+        with self._lock:
+            if self._busy_ema is None:
+                self._busy_ema = busy
+            else:
+                self._busy_ema += self.smoothing * (busy - self._busy_ema)
+
+            target = self._busy_ema * self.headroom
+            if queue_depth > 0:
+                # frames are piling up: sample less often than we finish them
+                target = max(target, self._interval * (1.0 + 0.25 * queue_depth))
+            self._interval = self._clamp(target)
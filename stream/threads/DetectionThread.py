@@ -1,36 +1,28 @@
+import os
 import queue
 import time
-import threading
 import cv2
 import numpy as np
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from stream.detection.DetectedObject import DetectedObject
+from stream.detection.DeletionGeometry import DeletionGeometry
+from stream.detection.DetectionCache import DetectionCache
+from stream.detection.DetectorWorker import DetectorWorker, RemoteDetector, RemoteFeatureExtractor
+from stream.detection.DetectionRoi import union_roi, split_tiles, clip_roi
+from stream.detection.FramePyramid import letterbox
 from stream.detection.YoloDetector import YoloDetector
-from stream.detection.Deepsort.DeepsortTracker import DeepSortTracker
+from stream.detection.Deepsort.DeepsortTracker import DeepSortTracker, PERSON_REID_PATH, VEHICLE_REID_PATH
 from utils.RegionManager import RegionManager
 from utils.GlobalState import GlobalState
 from utils.ConfigManager import ConfigManager
+from utils.TimerScheduler import TimerScheduler
 from utils.benchmark.MetricSignals import signals
 
 
-def lines_intersect(a1, a2, b1, b2):
-    def ccw(A, B, C):
-        return (C[1]-A[1]) * (B[0]-A[0]) > (B[1]-A[1]) * (C[0]-A[0])
-    return (ccw(a1, b1, b2) != ccw(a2, b1, b2)) and (ccw(a1, a2, b1) != ccw(a1, a2, b2))
-
-def point_to_segment_dist(px, py, x1, y1, x2, y2):
-    dx, dy = x2 - x1, y2 - y1
-    if dx == dy == 0:
-        return ((px - x1) ** 2 + (py - y1) ** 2) ** 0.5
-    t = max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
-    proj_x = x1 + t * dx
-    proj_y = y1 + t * dy
-    return ((px - proj_x) ** 2 + (py - proj_y) ** 2) ** 0.5
-
 class DetectionThread(QThread):
 
-    detections_ready = pyqtSignal(list, float)
+    detections_ready = pyqtSignal(object, float)
+    regions_reloaded = pyqtSignal()
     error_signal = pyqtSignal(str)
 
     def __init__(
@@ -43,22 +35,26 @@ class DetectionThread(QThread):
         mot_writer,
         location,
         homography_matrix=None,
+        offline: bool = False,
+        rate_controller=None,
         parent=None,
     ):
 
         super().__init__(parent)
 
-        yolo_cfg = ConfigManager(location=location).get_yolo_config()
-        self.detector = YoloDetector(yolo_config=yolo_cfg)
-
         self.detection_fps = detection_fps
         self.queue = detection_queue
         self.delay = float(delay)
+        self.offline = offline
+        self.rate_controller = rate_controller
+        self._last_capture_time = None
         self._run = True
 
         self.state = state
+        self.polygons_file = polygons_file
         self.editor = RegionManager(polygons_file)
         self.editor.load_polygons()
+        self._regions_mtime = self._polygons_mtime()
 
         self._timers = set()
 
@@ -66,22 +62,66 @@ class DetectionThread(QThread):
         self.frame_counter = 1
         self._mot_lines_buffer = []
 
-        self._blackout_mask = None
+        # blackout masks keyed by frame shape / tile geometry, rebuilt only
+        # when the region file changes
+        self._blackout_masks = {}
+        self._masked_buffers = []
+
+        # crop handed to the producer so the detector only sees annotated area
+        self.det_cfg = ConfigManager(location=location).get_detection_config()
+        self.detection_rois = self._compute_detection_rois()
+        self.deletion = DeletionGeometry(self.editor)
+
+        # micro-batching: up to batch_size frames or batch_timeout_ms per model call
+        self.batch_size = max(1, int(self.det_cfg.get("batch_size", 1)))
+        self.batch_timeout = float(self.det_cfg.get("batch_timeout_ms", 50)) / 1000.0
+        self._batch_busy = None
+
+        # tracking-by-prediction: a full pass every full_detection_interval
+        # frames, detector windows around the predicted tracks in between
+        self.full_interval = max(1, int(self.det_cfg.get("full_detection_interval", 1)))
+        self.refine_imgsz = int(self.det_cfg.get("refine_imgsz", 256))
+        self.refine_padding = int(self.det_cfg.get("refine_padding", 32))
+        self._since_full = 0
 
         self.location = location
+        yolo_cfg = ConfigManager(location=self.location).get_yolo_config()
         cfg = ConfigManager(location=self.location).get_deepsort_config()
-        self.tracker = DeepSortTracker(
-            max_disappeared   = cfg.get("max_disappeared"),
-            max_distance      = cfg.get("max_distance"),
-            device            = cfg.get("device"),
-            appearance_weight = cfg.get("appearance_weight"),
-            motion_weight     = cfg.get("motion_weight"),
-            iou_weight        = cfg.get("iou_weight"),
-            nn_budget         = cfg.get("nn_budget"),
-            homography_matrix = homography_matrix,
-            person_reid_path  = "PPLR+CAJ_market1501_86.1.pth",
-            vehicle_reid_path  = "PPLR+CAJ_veri_45.3.pth",
-        )
+
+        # offline runs of a recorded video can be served from a detection cache
+        self.cache = None
+        self._replay = None
+        self._replay_next = None
+        self._stream_finished = False
+        if offline and self.det_cfg.get("detection_cache", False) and location.get("video_path"):
+            self.cache = DetectionCache(
+                self.det_cfg.get("cache_dir", "detection_cache"),
+                location["video_path"],
+                self._cache_settings(yolo_cfg, cfg, homography_matrix),
+            )
+            if self.cache.complete:
+                self._replay = self.cache.frames()
+
+        self.detector = None
+        self.tracker = None
+        self.worker = None
+        if self._replay is not None:
+            print(f"Replaying detections from {self.cache.path}")
+        elif self.det_cfg.get("detector_process", False):
+            # inference runs in its own process, this thread only tracks
+            self.worker = DetectorWorker(
+                yolo_cfg, cfg.get("device"),
+                {"person": PERSON_REID_PATH, "vehicle": VEHICLE_REID_PATH},
+            )
+            self.detector = RemoteDetector(self.worker)
+            self._build_tracker(
+                cfg, homography_matrix,
+                person_extractor=RemoteFeatureExtractor(self.worker, "person"),
+                vehicle_extractor=RemoteFeatureExtractor(self.worker, "vehicle"),
+            )
+        else:
+            self.detector = YoloDetector(yolo_config=yolo_cfg)
+            self._build_tracker(cfg, homography_matrix)
 
         self.H_inv = None
         if homography_matrix is not None:
@@ -90,20 +130,124 @@ class DetectionThread(QThread):
             except np.linalg.LinAlgError:
                 self.H_inv = None
 
-    def _compute_static_mask(self, frame_shape):
-        # Create a single channel mask (uint8), initially all white (keep all)
-        mask = np.ones(frame_shape[:2], dtype=np.uint8) * 255
-        for poly in self.editor.other_regions.get("detection_blackout", []):
-            pts = np.array(poly["points"], dtype=np.int32)
-            cv2.fillPoly(mask, [pts], 0)
-        return mask
+    def _build_tracker(self, cfg, homography_matrix, person_extractor=None, vehicle_extractor=None):
+        self.tracker = DeepSortTracker(
+            max_disappeared    = cfg.get("max_disappeared"),
+            max_distance       = cfg.get("max_distance"),
+            device             = cfg.get("device"),
+            appearance_weight  = cfg.get("appearance_weight"),
+            motion_weight      = cfg.get("motion_weight"),
+            iou_weight         = cfg.get("iou_weight"),
+            nn_budget          = cfg.get("nn_budget"),
+            gating_threshold   = cfg.get("gating_threshold", 0.0),
+            max_iou_distance   = cfg.get("max_iou_distance", 0.7),
+            lazy_appearance    = cfg.get("lazy_appearance", False),
+            appearance_refresh = cfg.get("appearance_refresh", 10),
+            homography_matrix  = homography_matrix,
+            person_extractor   = person_extractor,
+            vehicle_extractor  = vehicle_extractor,
+        )
 
-    def _mask_blackout(self, frame):
-        masked = frame.copy()
-        for poly in self.editor.other_regions.get("detection_blackout", []):
-            pts = np.array(poly["points"], dtype=np.int32)
-            cv2.fillPoly(masked, [pts], (0, 0, 0))
-        return masked
+    def _cache_settings(self, yolo_cfg, deepsort_cfg, homography_matrix):
+        # everything that changes what the tracker outputs; crosswalk, sidewalk
+        # and traffic-light regions are left out so they can be iterated on
+        regions = self.editor.other_regions
+        return {
+            "yolo": yolo_cfg,
+            "deepsort": deepsort_cfg,
+            "detection_fps": self.detection_fps,
+            "sampling": {k: self.det_cfg.get(k) for k in ("adaptive_rate", "min_detection_fps", "max_detection_fps")},
+            "rois": self.detection_rois,
+            "refine": (self.full_interval, self.refine_imgsz, self.refine_padding),
+            "homography": None if homography_matrix is None else np.asarray(homography_matrix).tolist(),
+            "regions": {k: regions.get(k, []) for k in ("detection_blackout", "deletion_line", "pedestrian_deletion_line", "deletion_area")},
+        }
+
+    def _compute_detection_rois(self):
+        if not self.det_cfg.get("roi_crop", False):
+            return None
+        roi = union_roi(self.editor, padding=int(self.det_cfg.get("roi_padding", 32)))
+        return split_tiles(roi, int(self.det_cfg.get("roi_tiles", 1))) or None
+
+    def _polygons_mtime(self):
+        try:
+            return os.path.getmtime(self.polygons_file)
+        except (OSError, TypeError):
+            return None
+
+    def _reload_regions_if_changed(self):
+        mtime = self._polygons_mtime()
+        if mtime == self._regions_mtime:
+            return
+        try:
+            if mtime is not None and os.path.getsize(self.polygons_file) == 0:
+                # the editor truncates before writing; catch it on the next poll
+                return
+        except OSError:
+            return
+        packs = self.editor.crosswalk_packs
+        regions = {k: v for k, v in self.editor.other_regions.items()}
+        try:
+            self.editor.load_polygons()
+            detection_rois = self._compute_detection_rois()
+            deletion = DeletionGeometry(self.editor)
+        except (ValueError, OSError) as e:
+            # most likely caught mid-save: keep the previous regions and
+            # masks, and leave the mtime alone so the next poll retries
+            print(f"Reloading {self.polygons_file} failed, keeping the previous regions: {e}")
+            self.editor.crosswalk_packs = packs
+            self.editor.other_regions.update(regions)
+            return
+        self._regions_mtime = mtime
+        self._blackout_masks.clear()
+        self.detection_rois = detection_rois
+        self.deletion = deletion
+        self.regions_reloaded.emit()
+
+    def _compute_static_mask(self, frame_shape, to_coords=None):
+        # 0/1 multiplier with a channel axis, None when nothing is blacked out
+        polys = self.editor.other_regions.get("detection_blackout", [])
+        if not polys:
+            return None
+        mask = np.ones(frame_shape[:2], dtype=np.uint8)
+        for poly in polys:
+            pts = poly["points"] if to_coords is None else to_coords(poly["points"])
+            pts = np.round(np.asarray(pts, dtype=np.float32)).astype(np.int32)
+            cv2.fillPoly(mask, [pts], 0)
+        return mask[..., None]
+
+    def _cached_mask(self, key, frame_shape, to_coords=None):
+        if key not in self._blackout_masks:
+            self._blackout_masks[key] = self._compute_static_mask(frame_shape, to_coords)
+        return self._blackout_masks[key]
+
+    def _mask_blackout(self, frame, slot=0):
+        # the one copy out of the ring slot, into a buffer reused every frame;
+        # detection and ReID crops both read from it. Batched frames are
+        # tracked one after another, so each batch slot keeps its own buffer
+        while len(self._masked_buffers) <= slot:
+            self._masked_buffers.append(None)
+        buf = self._masked_buffers[slot]
+        if buf is None or buf.shape != frame.shape:
+            if self.worker is not None:
+                # ReID crops are then read by the worker without another copy
+                buf = self.worker.slots.array(("frame", slot), frame.shape)
+            else:
+                buf = np.empty_like(frame)
+            self._masked_buffers[slot] = buf
+        mask = self._cached_mask(frame.shape, frame.shape)
+        if mask is None:
+            np.copyto(buf, frame)
+        else:
+            np.multiply(frame, mask, out=buf)
+        return buf
+
+    def _mask_tiles(self, tiles):
+        # tiles are private to this frame, so they are masked in place
+        for tile in tiles:
+            mask = self._cached_mask(tile.key, tile.image.shape, tile.to_tile)
+            if mask is not None:
+                np.multiply(tile.image, mask, out=tile.image)
 
     def _bev_to_cam(self, pt):
         if self.H_inv is None:
@@ -113,116 +257,240 @@ class DetectionThread(QThread):
         res /= res[2, 0]
         return float(res[0, 0]), float(res[1, 0])
 
-    def _bbox_hits_deletion_line(self, bbox, threshold=6.0):
-        x1, y1, x2, y2 = bbox[:4]
-        bbox_edges = [
-            ((x1, y1), (x2, y1)),
-            ((x2, y1), (x2, y2)),
-            ((x2, y2), (x1, y2)),
-            ((x1, y2), (x1, y1)),
-        ]
-
-        def sample_edge(p1, p2, n=5):
-            return [(p1[0] + (p2[0] - p1[0]) * i / (n - 1), p1[1] + (p2[1] - p1[1]) * i / (n - 1)) for i in range(n)]
-
-        for rtype in ("deletion_line", "pedestrian_deletion_line"):
-            for line in self.editor.other_regions.get(rtype, []):
-                pts = line["points"]
-                if len(pts) >= 2:
-                    for i in range(len(pts) - 1):
-                        lx1, ly1 = pts[i]
-                        lx2, ly2 = pts[i + 1]
-                        for (b1, b2) in bbox_edges:
-                            if lines_intersect((lx1, ly1), (lx2, ly2), b1, b2):
-                                return True
-                            for (px, py) in sample_edge(b1, b2, n=5):
-                                dist = point_to_segment_dist(px, py, lx1, ly1, lx2, ly2)
-                                if dist <= threshold:
-                                    return True
-        return False
+    def on_stream_finished(self):
+        self._stream_finished = True
+
+    def _finish_stream(self):
+        # the producer only reports the end after its last put, so an empty
+        # queue means every frame has been through here
+        self._stream_finished = False
+        if self._replay is not None:
+            self._replay_until(None)
+        elif self.cache is not None:
+            self.cache.finish()
+
+    def _replay_until(self, frame_index):
+        # cached frames up to the one the producer just sampled, so the state
+        # advances with the video whichever frames are sampled this time
+        while True:
+            if self._replay_next is None:
+                self._replay_next = next(self._replay, None)
+                if self._replay_next is None:
+                    return
+            cached_index, capture_time, tracks, to_remove = self._replay_next
+            if frame_index is not None and cached_index > frame_index:
+                return
+            self._replay_next = None
+            if self.mot_writer is not None:
+                self.mot_writer.submit(self.frame_counter, tracks)
+            self.frame_counter += 1
+            if to_remove:
+                tracks = tracks[~np.isin(tracks.track_id, to_remove)]
+            self._emit_detections_with_deletion(tracks, to_remove, capture_time, state_time=capture_time)
 
     def run(self):
         while self._run:
-            try:
-                frame, capture_time, display_time = self.queue.get(timeout=0.05)
-            except queue.Empty:
-                continue
-
-            t_dequeue = time.time()
-            signals.queue_wait_logged.emit(t_dequeue - capture_time)
+            if self._stream_finished and self.queue.empty():
+                self._finish_stream()
 
-            masked = self._mask_blackout(frame)
-
-            t_inf_start = time.time()
-            detections = self.detector.run(masked)
-            t_inf_end = time.time()
-            signals.detection_logged.emit(t_inf_end - t_inf_start)
+            batch = self._collect_batch()
+            if not batch:
+                continue
 
-            t_post_start = time.time()
-            tracks_map, removed_ids= self.tracker.update(
-                detections,
-                frame=masked,
-                timestamp=capture_time,
-                detection_fps=self.detection_fps
-            )
+            if self._replay is not None:
+                for pyramid, _, _ in batch:
+                    pyramid.release()
+                    self._replay_until(pyramid.frame_index)
+                continue
 
-            if self.mot_writer is not None:
-                self.mot_writer.submit(self.frame_counter, tracks_map)
-            self.frame_counter += 1
+            self._reload_regions_if_changed()
 
-            ids_to_remove = []
-            objects_to_emit = []
-            for tid, (surface_point, bbox) in tracks_map.items():
+            frames = []
+            for slot, (pyramid, capture_time, display_time) in enumerate(batch):
+                if not self.offline:
+                    signals.queue_wait_logged.emit(time.time() - capture_time)
 
-                x1, y1, x2, y2, cls_idx, conf = bbox[:6]
-                obj_type = DetectedObject.CLASS_NAMES.get(cls_idx, "unknown")
+                # the masked copy is all we need, hand the ring slot back right away
+                try:
+                    masked = self._mask_blackout(pyramid.source.frame, slot)
+                finally:
+                    pyramid.release()
+                self._mask_tiles(pyramid.tiles)
+                frames.append((masked, pyramid.tiles, pyramid.frame_index, capture_time, display_time))
 
-                obj = DetectedObject(
-                    tid,
-                    obj_type,
-                    (int(x1), int(y1), int(x2), int(y2)),
-                    surface_point
+            try:
+                self._detect_and_track(frames)
+            except RuntimeError as e:
+                # e.g. the detector worker failed; let the controller report it
+                self.error_signal.emit(str(e))
+                break
+
+    def _detect_and_track(self, frames):
+        if self.full_interval > 1:
+            # windows come from the tracks of the previous frame, so
+            # frames are detected and tracked one at a time
+            for masked, tiles, frame_index, capture_time, display_time in frames:
+                t_inf_start = time.time()
+                if self._needs_full_pass(tiles):
+                    self._since_full = 0
+                else:
+                    self._since_full += 1
+                    tiles = self._refine_tiles(masked, capture_time)
+                detections = self.detector.run_tiles(tiles)
+                inference_time = time.time() - t_inf_start
+                signals.detection_logged.emit(inference_time)
+                self._track_and_emit(
+                    masked, detections, frame_index, capture_time, display_time, inference_time
                 )
+            return
+
+        t_batch_start = time.time()
+        if len(frames) == 1:
+            results = [self.detector.run_tiles(frames[0][1])]
+        else:
+            results = self.detector.run_batch([f[1] for f in frames])
+        # amortised per frame so the metrics stay comparable with batch_size 1
+        inference_time = (time.time() - t_batch_start) / len(frames)
+
+        for (masked, _, frame_index, capture_time, display_time), detections in zip(frames, results):
+            signals.detection_logged.emit(inference_time)
+            self._track_and_emit(
+                masked, detections, frame_index, capture_time, display_time, inference_time
+            )
 
-                obj.confidence = float(conf)
+        busy = time.time() - t_batch_start
+        self._batch_busy = busy if self._batch_busy is None else 0.8 * self._batch_busy + 0.2 * busy
+
+    def _needs_full_pass(self, full_tiles):
+        tracks = self.tracker.tracks
+        if self._since_full + 1 >= self.full_interval or not tracks:
+            return True
+        # one refine window per track: once they add up to more pixels than
+        # the full pass they would replace, refining saves nothing
+        full_pixels = sum(t.image.shape[0] * t.image.shape[1] for t in full_tiles)
+        if len(tracks) * self.refine_imgsz ** 2 > full_pixels:
+            return True
+        # a track missed on the last frame means the prediction is drifting
+        # (or it was occluded): look at the whole frame again
+        return any(t.time_since_update == 1 for t in tracks)
+
+    def _refine_tiles(self, frame, capture_time):
+        prev = self._last_capture_time
+        dt = capture_time - prev if prev is not None and capture_time > prev else 1.0 / self.detection_fps
+        tiles = []
+        for track in self.tracker.tracks:
+            # the last measured box, moved by the filter's predicted motion
+            px, py = self._bev_to_cam(track.predicted_point(dt))
+            mx, my = self._bev_to_cam(track.prev_measured_centroid)
+            x1, y1, x2, y2 = np.asarray(track.bbox[:4], dtype=np.float32) + (px - mx, py - my, px - mx, py - my)
+            pad = max(self.refine_padding, 0.5 * max(x2 - x1, y2 - y1))
+            x1, y1, x2, y2 = clip_roi(
+                (int(x1 - pad), int(y1 - pad), int(x2 + pad), int(y2 + pad)), frame.shape
+            )
+            tiles.append(letterbox(
+                frame[y1:y2, x1:x2], self.refine_imgsz, offset=(x1, y1),
+                source_shape=frame.shape, max_scale=1.0, square=True
+            ))
+        return tiles
+
+    def _collect_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.05)]
+        except queue.Empty:
+            return []
+        if self.batch_size <= 1:
+            return batch
+
+        deadline = time.time() + self.batch_timeout
+        if not self.offline:
+            # waiting here adds to the display latency of the first frame,
+            # which has to be emitted within delay_seconds of its capture
+            budget = self.delay - (self._batch_busy or 0.0) - (time.time() - batch[0][1])
+            deadline = min(deadline, time.time() + budget)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _track_and_emit(self, masked, detections, frame_index, capture_time, display_time, inference_time):
+        t_post_start = time.time()
+        tracks, removed_ids = self.tracker.update(
+            detections,
+            frame=masked,
+            timestamp=capture_time,
+            detection_fps=self._effective_fps(capture_time)
+        )
 
-                for t in self.tracker.tracks:
-                    if t.track_id == tid:
-                        obj.motion_distance = getattr(t, "motion_distance", None)
-                        obj.appearance_distance = getattr(t, "appearance_distance", None)
-                        break
-                objects_to_emit.append(obj)
+        if self.mot_writer is not None:
+            self.mot_writer.submit(self.frame_counter, tracks)
+        self.frame_counter += 1
+
+        # tracks leaving the scene are retired before they cost another
+        # round of matching and ReID
+        ids_to_remove = []
+        objects_to_emit = tracks
+        if self.deletion and len(tracks):
+            hit = self.deletion.hits(tracks.bbox, tracks.cls)
+            if hit.any():
+                ids_to_remove = tracks.track_id[hit].tolist()
+                objects_to_emit = tracks[~hit]
+
+        all_to_remove = list(set(ids_to_remove) | set(removed_ids))
+        if all_to_remove:
+            self.tracker.remove_tracks(all_to_remove)
+        if self.cache is not None:
+            self.cache.record(
+                frame_index, capture_time, detections, self.tracker.last_features, tracks, all_to_remove
+            )
 
-            all_to_remove = list(set(ids_to_remove) | set(removed_ids))
-            if all_to_remove:
-                self.tracker.remove_tracks(all_to_remove)
+        t_post_end = time.time()
+        signals.postproc_logged.emit(t_post_end - t_post_start)
+        if self.rate_controller is not None:
+            self.rate_controller.report(
+                inference_time, t_post_end - t_post_start, self.queue.qsize()
+            )
 
-            signals.postproc_logged.emit(time.time() - t_post_start)
+        if self.offline:
+            # no display delay to honour and every timestamp is the video PTS
+            self._emit_detections_with_deletion(
+                objects_to_emit, all_to_remove, capture_time, state_time=capture_time
+            )
+            return
 
-            emit_at = display_time + self.delay
-            wait = emit_at - time.time()
+        emit_at = display_time + self.delay
 
-            schedule_delay = emit_at - time.time()
-            signals.scheduling_logged.emit(schedule_delay)
+        schedule_delay = emit_at - time.time()
+        signals.scheduling_logged.emit(schedule_delay)
 
-            timer = threading.Timer(
-                max(0.0, wait),
-                lambda objs=objects_to_emit, rm=all_to_remove, cap=capture_time:
-                self._emit_detections_with_deletion(objs, rm, cap)
-            )
+        self._timers = {t for t in self._timers if t.pending}
+        self._timers.add(TimerScheduler.instance().call_at(
+            emit_at,
+            self._emit_detections_with_deletion,
+            objects_to_emit, all_to_remove, capture_time
+        ))
 
-            timer.daemon = True
-            timer.start()
+    def _effective_fps(self, capture_time):
+        # the sampling interval is not constant (adaptive rate, grab-only,
+        # dropped frames), so the tracker predicts over the real gap
+        prev, self._last_capture_time = self._last_capture_time, capture_time
+        if prev is None or capture_time <= prev:
+            return self.detection_fps
+        return 1.0 / (capture_time - prev)
 
     def _emit_detections(self, detected_objects, capture_time):
         self.state.update(detected_objects, time.time())
         self.detections_ready.emit(detected_objects, capture_time)
 
-    def _emit_detections_with_deletion(self, objects, ids_to_remove, capture_time):
+    def _emit_detections_with_deletion(self, objects, ids_to_remove, capture_time, state_time=None):
         if ids_to_remove:
             self.state.remove(ids_to_remove)
         if objects:
-            self.state.update(objects, time.time())
+            self.state.update(objects, time.time() if state_time is None else state_time)
         self.detections_ready.emit(objects, capture_time)
 
     def stop(self):
@@ -232,3 +500,6 @@ class DetectionThread(QThread):
         self._timers.clear()
         self.quit()
         self.wait()
+        if self.worker is not None:
+            self._masked_buffers = []
+            self.worker.close()
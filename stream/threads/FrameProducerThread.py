@@ -5,46 +5,48 @@ import time
 import queue
 
 from PyQt5 import QtCore
+from stream.BoundedFrameQueue import BoundedFrameQueue
+from stream.FrameRing import FrameRing, FrameRef
+from stream.LatestFrameMailbox import LatestFrameMailbox
 from stream.StreamContainer import StreamContainer
 from utils.RegionManager import RegionManager
+from utils.TimerScheduler import TimerScheduler
 from stream.crosswalk_inspector.TrafficLight import TrafficLight
+from stream.detection.FramePyramid import FramePyramid, display_image
 from concurrent.futures import ThreadPoolExecutor
 
-def wait_until(target: float):
-    delta = max(0.0, target - time.time())
-    if delta > 0:
-        loop = QtCore.QEventLoop()
-        timer = QtCore.QTimer()
-        timer.setTimerType(QtCore.Qt.PreciseTimer)
-        timer.setSingleShot(True)
-        timer.timeout.connect(loop.quit)
-        timer.start(int(delta * 1000))
-        loop.exec_()
-
-def _drop_old_and_put(q: queue.Queue, item, limit: int):
-    print(">>> Dropping old items")
-    while q.qsize() >= limit:
+def _put_blocking(q, item, keep_running) -> bool:
+    # offline backpressure: wait for the consumer instead of dropping
+    while keep_running():
         try:
-            q.get_nowait()
-        except queue.Empty:
-            break
-    q.put_nowait(item)
+            q.put_wait(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    item[0].release()
+    return False
 
 class FrameProducerThread(QtCore.QThread):
 
     error_signal = QtCore.pyqtSignal(str)
     traffic_light_crops = QtCore.pyqtSignal(list)
+    stream_finished = QtCore.pyqtSignal()
 
     def __init__(
         self,
         source: str,
-        video_queue: queue.Queue,
-        detection_queue: queue.Queue,
+        video_queue: BoundedFrameQueue,
+        detection_queue: LatestFrameMailbox,
         detection_fps: float,
         traffic_light_fps: float,
         use_av: bool,
         editor: RegionManager,
         max_resolution: tuple = (1920, 1080),
+        buffer_seconds: float = 1.0,
+        grab_only: bool = False,
+        offline: bool = False,
+        rate_controller=None,
+        detection_imgsz: int = 640,
         parent=None
     ):
         super().__init__(parent)
@@ -65,6 +67,14 @@ class FrameProducerThread(QtCore.QThread):
         self._run              = True
         self.editor            = editor
         self.max_resolution    = max_resolution
+        self.buffer_seconds    = buffer_seconds
+        self.grab_only         = grab_only
+        self.offline           = offline
+        self.rate_controller   = rate_controller
+        self.detection_imgsz   = detection_imgsz
+        self.detection_rois    = None
+        self.source_size       = None
+        self.frame_ring        = None
 
         self.tl_objects        = []
         if self.editor:
@@ -92,21 +102,53 @@ class FrameProducerThread(QtCore.QThread):
         except Exception as e:
             self.error_signal.emit(str(e))
 
-    def _produce_crop(self, frame, capture_time):
-        batch = [(tl, tl.crop_regions(frame), capture_time) for tl in self.tl_objects]
+    def _produce_crop(self, ref: FrameRef, capture_time):
+        try:
+            batch = [(tl, tl.crop_regions(ref.frame), capture_time) for tl in self.tl_objects]
+        finally:
+            ref.release()
         self.traffic_light_crops.emit(batch)
 
+    def _buffered_frames(self, cap) -> int:
+        # every frame stays referenced while it waits in video_queue, so the
+        # queue and the ring have to cover the consumer's buffering window
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return max(1, int(fps * self.buffer_seconds))
+
+    def _retrieve_into_ring(self, cap):
+        slot = self.frame_ring.acquire()
+        buf = self.frame_ring.buffer(slot)
+        ok, frame = cap.retrieve() if buf is None else cap.retrieve(buf)
+        if not ok or frame is None:
+            self.frame_ring.discard(slot)
+            return None
+        return self.frame_ring.commit(slot, frame)
+
+    def _dispatch(self, ref: FrameRef, capture_time, sched_time,
+                  to_video: bool, to_detection: bool, to_crop: bool, frame_index=None):
+        if self.source_size is None:
+            self.source_size = (ref.shape[1], ref.shape[0])
+
+        if to_crop:
+            self._crop_executor.submit(self._produce_crop, ref.retain(), capture_time)
+
+        if to_video:
+            item = (display_image(ref, self.max_resolution), capture_time, sched_time)
+            if self.offline:
+                _put_blocking(self.video_q, item, lambda: self._run)
+            else:
+                self.video_q.put(item)
 
-    @staticmethod
-    def _downscale_if_needed(frame, max_res):
-        h, w = frame.shape[:2]
-        max_w, max_h = max_res
-        if w > max_w or h > max_h:
-            scale = min(max_w / w, max_h / h)
-            new_w = int(w * scale)
-            new_h = int(h * scale)
-            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
-        return frame
+        if to_detection:
+            # detector input is resized and colour converted once, here
+            pyramid = FramePyramid.build(
+                ref.retain(), self.detection_imgsz, self.detection_rois, frame_index
+            )
+            item = (pyramid, capture_time, sched_time)
+            if self.offline:
+                _put_blocking(self.detection_q, item, lambda: self._run)
+            else:
+                self.detection_q.put(item)
 
     def _run_opencv(self):
         cap = cv2.VideoCapture(self.source)
@@ -114,40 +156,59 @@ class FrameProducerThread(QtCore.QThread):
             raise RuntimeError(f"Cannot open video source: {self.source}")
         wall_start = time.time()
         video_ts0 = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-        last_det = time.time()
+        last_det = video_ts0 if self.offline else time.time()
         det_interval = 1.0 / self.detection_fps
 
+        buffered = self._buffered_frames(cap)
+        if not self.offline:
+            self.video_q.resize(buffered)
+        # headroom for the detection queue, crop jobs and frames in use
+        self.frame_ring = FrameRing(
+            min(buffered, self.video_q.maxsize) + self.detection_q.maxsize + 8
+        )
+
         while self._run and cap.isOpened():
-            ok, frame = cap.read()
-            if not ok or frame is None:
+            if not cap.grab():
+                if self.offline:
+                    # end of the recording: everything has been handed on
+                    self.stream_finished.emit()
+                    break
                 time.sleep(0.01)
                 continue
 
-            # frame = self._downscale_if_needed(frame, self.max_resolution)
             vid_ts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
-            sched_time = wall_start + (vid_ts - video_ts0)
-            wait_until(sched_time)
-            capture_time = time.time()
-            item = (frame.copy(), capture_time, sched_time)
+            if self.offline:
+                # unpaced: every timestamp downstream is the video PTS
+                sched_time = capture_time = vid_ts
+            else:
+                sched_time = wall_start + (vid_ts - video_ts0)
+                TimerScheduler.instance().wait_until(sched_time)
+                capture_time = time.time()
 
             now = capture_time
-            if self.tl_objects and (now - self._last_tl_emit) >= self._tl_interval:
-                frame_for_crop = frame.copy()
-                self._crop_executor.submit(self._produce_crop, frame_for_crop, capture_time)
-                self._last_tl_emit = now
+            to_crop = bool(self.tl_objects) and (now - self._last_tl_emit) >= self._tl_interval
+            if self.rate_controller is not None:
+                det_interval = self.rate_controller.interval()
+            to_detection = (capture_time - last_det) >= det_interval
+
+            # grab-only: frames that neither detection nor the traffic-light
+            # monitor sample are never decoded, the display shows sampled ones
+            if self.grab_only and not (to_detection or to_crop):
+                continue
 
-            if self.video_q.maxsize:
-                _drop_old_and_put(self.video_q, item, self.video_q.maxsize)
-            else:
-                self.video_q.put(item)
+            ref = self._retrieve_into_ring(cap)
+            if ref is None:
+                continue
 
-            if (capture_time - last_det) >= det_interval:
-                if self.detection_q.maxsize:
-                    _drop_old_and_put(self.detection_q, item, self.detection_q.maxsize)
-                else:
-                    self.detection_q.put(item)
+            if to_crop:
+                self._last_tl_emit = now
+            if to_detection:
                 last_det += det_interval
 
+            frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+            self._dispatch(ref, capture_time, sched_time, True, to_detection, to_crop, frame_index)
+            ref.release()
+
     def _run_av(self):
         base_pts = None
         wall_start = None
@@ -170,33 +231,26 @@ class FrameProducerThread(QtCore.QThread):
                     capture_time = time.time()
                     img = frame_pkt.to_ndarray(format='bgr24')
 
-                    #img = self._downscale_if_needed(img, self.max_resolution)
-
-                    frame_buffer.append((img.copy(), capture_time, sched_time))
+                    frame_buffer.append((FrameRef.wrap(img), capture_time, sched_time))
 
                     now = capture_time
                     while frame_buffer and (now - frame_buffer[0][1]) >= buffer_delay:
-                        buffered_img, buffered_capture_time, buffered_sched_time = frame_buffer.popleft()
-
-                        item = (buffered_img, buffered_capture_time, buffered_sched_time)
+                        buffered_ref, buffered_capture_time, buffered_sched_time = frame_buffer.popleft()
 
-                        if self.video_q.maxsize:
-                            _drop_old_and_put(self.video_q, item, self.video_q.maxsize)
-                        else:
-                            self.video_q.put(item)
-
-                        if (buffered_capture_time - last_det) >= det_interval:
-                            if self.detection_q.maxsize:
-                                _drop_old_and_put(self.detection_q, item, self.detection_q.maxsize)
-                            else:
-                                self.detection_q.put(item)
+                        to_detection = (buffered_capture_time - last_det) >= det_interval
+                        if to_detection:
                             last_det = buffered_capture_time
 
-                        if self.tl_objects and (now - self._last_tl_emit) >= self._tl_interval:
-                            img_for_crop = buffered_img.copy()
-                            self._crop_executor.submit(self._produce_crop, img_for_crop, buffered_capture_time)
+                        to_crop = bool(self.tl_objects) and (now - self._last_tl_emit) >= self._tl_interval
+                        if to_crop:
                             self._last_tl_emit = now
 
+                        self._dispatch(
+                            buffered_ref, buffered_capture_time, buffered_sched_time,
+                            True, to_detection, to_crop
+                        )
+                        buffered_ref.release()
+
     def stop(self):
         self._run = False
         self._crop_executor.shutdown(wait=False)
@@ -2,6 +2,10 @@ import threading
 import queue
 import os
 
+import numpy as np
+
+MOT_FORMAT = "%d,%d,%.2f,%.2f,%.2f,%.2f,%.3f,%d,%d,%d"
+
 class MotWriterThread(threading.Thread):
     def __init__(self, filename):
         super().__init__()
@@ -21,23 +25,26 @@ class MotWriterThread(threading.Thread):
                 continue
             if data is None:
                 break
-            frame_idx, tracks_map = data
-            for track_id, (centroid, bbox) in tracks_map.items():
-                x1, y1, x2, y2, cls_idx, conf = bbox[:6]
-                bb_left = float(x1)
-                bb_top = float(y1)
-                bb_width = float(x2 - x1)
-                bb_height = float(y2 - y1)
-                conf_val = float(conf) if conf is not None else 1.0
-                line = f"{frame_idx},{track_id},{bb_left:.2f},{bb_top:.2f},{bb_width:.2f},{bb_height:.2f},{conf_val:.3f},-1,-1,-1\n"
-                self._buffer.append(line)
+            frame_idx, tracks = data
+            if not len(tracks):
+                continue
+            box = tracks.bbox
+            self._buffer.append(np.column_stack([
+                np.full(len(tracks), frame_idx),
+                tracks.track_id,
+                box[:, 0], box[:, 1],
+                box[:, 2] - box[:, 0], box[:, 3] - box[:, 1],
+                np.nan_to_num(tracks.conf, nan=1.0),
+                np.full((len(tracks), 3), -1),
+            ]))
 
-    def submit(self, frame_idx, tracks_map):
-        self.queue.put((frame_idx, tracks_map))
+    def submit(self, frame_idx, tracks):
+        self.queue.put((frame_idx, tracks))
 
     def stop(self):
         self._run = False
         self.queue.put(None)
         self.join()
         with open(self.filename, "w") as f:
-            f.writelines(self._buffer)
+            if self._buffer:
+                np.savetxt(f, np.concatenate(self._buffer), fmt=MOT_FORMAT)
@@ -4,28 +4,21 @@ import cv2
 from PyQt5 import QtCore, QtGui
 
 
+from utils.TimerScheduler import TimerScheduler
 from utils.benchmark.MetricSignals import signals
 
-def wait_until(target: float):
-    delta = max(0.0, target - time.time())
-    if delta > 0:
-        loop = QtCore.QEventLoop()
-        timer = QtCore.QTimer()
-        timer.setTimerType(QtCore.Qt.PreciseTimer)
-        timer.setSingleShot(True)
-        timer.timeout.connect(loop.quit)
-        timer.start(int(delta * 1000))
-        loop.exec_()
-
 class VideoConsumerThread(QtCore.QThread):
     frame_ready = QtCore.pyqtSignal(QtGui.QImage)
     error_signal = QtCore.pyqtSignal(str)
 
-    def __init__(self, video_queue: "queue.Queue", delay, parent=None):
+    def __init__(self, video_queue: "queue.Queue", delay, offline: bool = False, parent=None):
         super().__init__(parent)
         self.queue = video_queue
         self.delay = float(delay)
+        self.offline = offline
         self._running = True
+        self._last_shown = 0.0
+        self._min_show_interval = 1.0 / 25.0
 
     @staticmethod
     def _to_qimage(bgr):
@@ -36,25 +29,34 @@ class VideoConsumerThread(QtCore.QThread):
     def run(self):
         while self._running:
             try:
-                frame, _, display_time = self.queue.get(timeout=0.05)
+                ref, _, display_time = self.queue.get(timeout=0.05)
                 t_consume_start = time.time()
             except queue.Empty:
                 continue
 
-            target = display_time + self.delay
-            if time.time() > target:
-                print("Video frame timed out")
-                continue
+            try:
+                if self.offline:
+                    # display timestamps are video PTS here, so there is
+                    # nothing to pace against; just keep the GUI from flooding
+                    if t_consume_start - self._last_shown < self._min_show_interval:
+                        continue
+                    self._last_shown = t_consume_start
+                else:
+                    target = display_time + self.delay
+                    if time.time() > target:
+                        print("Video frame timed out")
+                        continue
 
-            wait_until(target)
+                    TimerScheduler.instance().wait_until(target)
 
-            try:
-                qimg = self._to_qimage(frame)
+                qimg = self._to_qimage(ref.frame)
                 self.frame_ready.emit(qimg)
                 t_consume_end = time.time()
                 signals.consumer_logged.emit(t_consume_end - t_consume_start)
             except Exception as e:
                 self.error_signal.emit(str(e))
+            finally:
+                ref.release()
 
     def stop(self):
         self._running = False
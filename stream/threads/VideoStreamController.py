@@ -1,18 +1,24 @@
 import os
-import queue
 
 import numpy as np
 from PyQt5 import QtCore
 
+from stream.BoundedFrameQueue import BoundedFrameQueue
+from stream.LatestFrameMailbox import LatestFrameMailbox
 from stream.crosswalk_inspector.CrosswalkInspectThread import CrosswalkInspectThread
 from stream.crosswalk_inspector.TrafficLightMonitorThread import TrafficLightMonitorThread
 from stream.threads.MotWriterThread import MotWriterThread
 from stream.threads.FrameProducerThread import FrameProducerThread
 from stream.threads.VideoConsumerThread import VideoConsumerThread
 from stream.threads.DetectionThread import DetectionThread
+from stream.threads.DetectionRateController import DetectionRateController
 from utils.ConfigManager import ConfigManager
 
 
+def _release_item(item):
+    item[0].release()
+
+
 class VideoStreamController(QtCore.QObject):
     frame_ready = QtCore.pyqtSignal(object)
     detection_update = QtCore.pyqtSignal()
@@ -24,14 +30,44 @@ class VideoStreamController(QtCore.QObject):
         self.state = state
         self.editor = editor
 
-        self.video_queue = queue.Queue()
-        self.detection_queue = queue.Queue()
-
         cfg = ConfigManager(location=self.location)
         self.detection_fps = cfg.get_detection_fps()
         self.delay_seconds = cfg.get_delay_seconds()
         self.traffic_light_fps = cfg.get_traffic_light_fps()
+        self.detection_imgsz = cfg.get_yolo_config().get("imgsz", 640)
         self.enable_mot_writer = cfg.get_detection_config().get("enable_mot_writer", True)
+        self.grab_only = cfg.get_detection_config().get("grab_only", False)
+        # unpaced processing only makes sense for recorded footage
+        self.offline = (
+            bool(cfg.get_detection_config().get("offline", False))
+            and "video_path" in self.location
+        )
+
+        det_cfg = cfg.get_detection_config()
+        self.rate_controller = None
+        if det_cfg.get("adaptive_rate", False):
+            # a hand-edited config may have the bounds swapped or unset;
+            # clamp rather than fail the whole stream at start
+            min_fps = float(det_cfg.get("min_detection_fps") or 2)
+            max_fps = float(det_cfg.get("max_detection_fps") or self.detection_fps)
+            min_fps = max(min_fps, 0.1)
+            if max_fps < min_fps:
+                print(f"max_detection_fps {max_fps} < min_detection_fps {min_fps}, using {min_fps}")
+                max_fps = min_fps
+            self.rate_controller = DetectionRateController(
+                self.detection_fps, min_fps=min_fps, max_fps=max_fps,
+            )
+
+        # offline runs keep the video queue short so that the producer blocks
+        # instead of racing ahead; live runs size it from the source fps
+        video_queue_size = 8 if self.offline else int((self.delay_seconds + 1.0) * 30)
+        self.video_queue = BoundedFrameQueue("video", video_queue_size, on_drop=_release_item)
+        self.batch_size = max(1, int(det_cfg.get("batch_size", 1)))
+        if self.batch_size > 1:
+            # the detection thread has to be able to collect a whole batch
+            self.detection_queue = BoundedFrameQueue("detection", self.batch_size, on_drop=_release_item)
+        else:
+            self.detection_queue = LatestFrameMailbox("detection", on_drop=_release_item)
 
         self.mot_writer = None
         self.tl_monitor = None
@@ -55,7 +91,9 @@ class VideoStreamController(QtCore.QObject):
         homography, H_inv = self._compute_homography_and_inverse(self.location)
         self.H_inv = H_inv
 
-        self.tl_monitor = TrafficLightMonitorThread(delay=self.delay_seconds)
+        self.tl_monitor = TrafficLightMonitorThread(
+            delay=0.0 if self.offline else self.delay_seconds
+        )
         self.tl_monitor.error_signal.connect(self._on_error)
         self.tl_monitor.start()
 
@@ -67,7 +105,12 @@ class VideoStreamController(QtCore.QObject):
             detection_fps=self.detection_fps,
             use_av=use_av,
             traffic_light_fps=self.traffic_light_fps,
-            editor=self.editor
+            editor=self.editor,
+            buffer_seconds=self.delay_seconds + 1.0,
+            grab_only=self.grab_only,
+            offline=self.offline,
+            rate_controller=self.rate_controller,
+            detection_imgsz=self.detection_imgsz
         )
 
         self.producer.traffic_light_crops.connect(
@@ -84,12 +127,15 @@ class VideoStreamController(QtCore.QObject):
             homography_inv = self.H_inv,
             location_name  = self.location["name"],
             is_live        = use_av,
-            delay_seconds  = self.delay_seconds
+            delay_seconds  = self.delay_seconds,
+            use_stream_time = self.offline
         )
         self.crosswalk_monitor.error_signal.connect(self._on_error)
         self.crosswalk_monitor.start()
 
-        self.video_consumer = VideoConsumerThread(self.video_queue, delay=self.delay_seconds)
+        self.video_consumer = VideoConsumerThread(
+            self.video_queue, delay=self.delay_seconds, offline=self.offline
+        )
         self.video_consumer.frame_ready.connect(self._on_frame_ready)
         self.video_consumer.error_signal.connect(self._on_error)
         self.video_consumer.start()
@@ -102,9 +148,15 @@ class VideoStreamController(QtCore.QObject):
             delay=self.delay_seconds,
             mot_writer=self.mot_writer,
             location=self.location,
-            homography_matrix=homography
+            homography_matrix=homography,
+            offline=self.offline,
+            rate_controller=self.rate_controller
         )
 
+        self.producer.detection_rois = self.detection_thread.detection_rois
+
+        self.producer.stream_finished.connect(self.detection_thread.on_stream_finished)
+        self.detection_thread.regions_reloaded.connect(self._on_regions_reloaded)
         self.detection_thread.detections_ready.connect(self._on_detection_ready)
         self.detection_thread.error_signal.connect(self._on_error)
         self.detection_thread.start()
@@ -134,6 +186,10 @@ class VideoStreamController(QtCore.QObject):
     def _on_frame_ready(self, q_img):
         self.frame_ready.emit(q_img)
 
+    def _on_regions_reloaded(self):
+        if self.producer and self.detection_thread:
+            self.producer.detection_rois = self.detection_thread.detection_rois
+
     def _on_detection_ready(self, *args):
         self.detection_update.emit()
 
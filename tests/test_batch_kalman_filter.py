@@ -0,0 +1,80 @@
+import numpy as np
+
+from stream.detection.Deepsort.KalmanFilter import BatchKalmanFilter
+
+
+class ReferenceKalmanFilter:
+    """The former per-track filter that BatchKalmanFilter replaced."""
+
+    def __init__(self, initial_state):
+        self.x = np.array(initial_state, dtype=float).reshape((4, 1))
+        self.P = np.eye(4) * 10.0
+        self.H = np.array([[1, 0, 0, 0],
+                           [0, 1, 0, 0]], dtype=float)
+        self.R = np.eye(2) * 1.0
+        self.Q = np.eye(4) * 0.01
+
+    def predict_with_dt(self, dt):
+        F = np.array([
+            [1, 0, dt, 0],
+            [0, 1, 0, dt],
+            [0, 0, 1,  0],
+            [0, 0, 0,  1]
+        ], dtype=float)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self.Q
+        return self.x
+
+    def update(self, measurement):
+        z = np.array(measurement, dtype=float).reshape((2, 1))
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(4) - K @ self.H) @ self.P
+        return self.x
+
+    def gating_distance(self, dets):
+        x = self.x[:2].reshape((2,))
+        invS = np.linalg.inv(self.H @ self.P @ self.H.T + self.R)
+        return np.array([float((d - x) @ invS @ (d - x)) for d in np.asarray(dets, dtype=float)])
+
+
+def test_batch_filter_matches_per_track_filters():
+    rng = np.random.default_rng(0)
+    # a small capacity so the bank has to grow mid-run
+    bank = BatchKalmanFilter(capacity=4)
+    states = rng.uniform(-50, 50, size=(10, 4))
+    slots = [bank.track(s) for s in states]
+    refs = [ReferenceKalmanFilter(s) for s in states]
+    ids = [s.slot for s in slots]
+
+    for _ in range(20):
+        dt = rng.uniform(0.05, 0.5)
+        # only some tracks are predicted and measured each step
+        moving = rng.random(len(ids)) < 0.7
+        bank.predict(np.array(ids)[moving], dt)
+        for ref in np.array(refs)[moving]:
+            ref.predict_with_dt(dt)
+
+        measured = np.flatnonzero(rng.random(len(ids)) < 0.6)
+        z = rng.uniform(-50, 50, size=(len(measured), 2))
+        bank.update(np.array(ids)[measured], z)
+        for i, zi in zip(measured, z):
+            refs[i].update(zi)
+
+        points = rng.uniform(-60, 60, size=(5, 2))
+        gating = bank.gating_distance(ids, points)
+        for i, (slot, ref) in enumerate(zip(slots, refs)):
+            np.testing.assert_allclose(slot.x, ref.x, rtol=1e-9, atol=1e-9)
+            np.testing.assert_allclose(slot.P, ref.P, rtol=1e-9, atol=1e-9)
+            np.testing.assert_allclose(gating[i], ref.gating_distance(points), rtol=1e-9, atol=1e-9)
+
+
+def test_released_slots_are_reused_lowest_first():
+    bank = BatchKalmanFilter(capacity=2)
+    a, b, c = (bank.track(np.zeros(4)) for _ in range(3))
+    assert (a.slot, b.slot, c.slot) == (0, 1, 2)
+    b.release()
+    a.release()
+    assert bank.track(np.ones(4)).slot == 0
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+pytest.importorskip("av")
+pytest.importorskip("torch")
+
+from PyQt5 import QtWidgets
+
+from gui.windows.VideoPlayerWindow import VideoPlayerWindow
+from stream.BoundedFrameQueue import BoundedFrameQueue
+from stream.LatestFrameMailbox import LatestFrameMailbox
+from stream.threads.VideoStreamController import VideoStreamController
+
+
+class _Frame:
+    def release(self):
+        pass
+
+
+def _controller(tmp_path, monkeypatch, batch_size):
+    # ConfigManager reads resources/ relative to the working directory
+    (tmp_path / "resources").mkdir()
+    (tmp_path / "resources" / "config.yml").write_text(yaml.dump({
+        "yolo": {"imgsz": 640},
+        "detection_thread": {"detection_fps": 10, "delay_seconds": 1.0, "batch_size": batch_size},
+        "crosswalk_monitor": {"traffic_light_fps": 1},
+    }))
+    monkeypatch.chdir(tmp_path)
+    # only the queues are under test, not the threads _setup() starts
+    monkeypatch.setattr(VideoStreamController, "_setup", lambda self: None)
+    return VideoStreamController({"name": "test", "video_path": "test.mp4"}, None, None)
+
+
+@pytest.mark.parametrize("batch_size, queue_type", [(1, LatestFrameMailbox), (4, BoundedFrameQueue)])
+def test_drop_label_reads_either_detection_queue(qapp, tmp_path, monkeypatch, batch_size, queue_type):
+    backend = _controller(tmp_path, monkeypatch, batch_size)
+    assert isinstance(backend.detection_queue, queue_type)
+
+    for i in range(batch_size + 2):
+        backend.detection_queue.put((_Frame(), i))
+
+    window = SimpleNamespace(backend=backend, queue_drop_label=QtWidgets.QLabel())
+    VideoPlayerWindow._update_queue_drop_label(window)
+    assert window.queue_drop_label.text() == "Dropped frames: video 0, detection 2"
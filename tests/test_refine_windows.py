@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("av")
+pytest.importorskip("torch")
+
+from stream.detection.FramePyramid import letterbox
+from stream.threads.DetectionThread import DetectionThread
+
+FRAME = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+
+def _track(bbox):
+    centre = ((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2)
+    return SimpleNamespace(
+        bbox=np.array([*bbox, 0, 0.9], dtype=np.float32), time_since_update=0,
+        prev_measured_centroid=centre, predicted_point=lambda dt: centre,
+    )
+
+
+def _thread(n_tracks):
+    return SimpleNamespace(
+        tracker=SimpleNamespace(tracks=[_track((100 * i, 100, 100 * i + 40, 180)) for i in range(n_tracks)]),
+        full_interval=5, _since_full=0, refine_imgsz=256, refine_padding=32,
+        _last_capture_time=None, detection_fps=10.0, _bev_to_cam=lambda pt: pt,
+    )
+
+
+def test_refine_falls_back_to_full_pass_when_windows_cost_more():
+    # 1080p at imgsz 640 is a 640 x 384 input, about 3.75 windows of 256^2
+    full_tiles = [letterbox(FRAME, 640)]
+    assert not DetectionThread._needs_full_pass(_thread(3), full_tiles)
+    assert DetectionThread._needs_full_pass(_thread(4), full_tiles)
+
+
+def test_refine_windows_are_not_upscaled():
+    tiles = DetectionThread._refine_tiles(_thread(2), FRAME, capture_time=0.0)
+    assert len(tiles) == 2
+    for tile in tiles:
+        assert tile.scale == 1.0
+        assert tile.image.shape[:2] == (256, 256)
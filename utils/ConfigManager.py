@@ -37,6 +37,7 @@ class ConfigManager:
         return {
             "yolo": {
                 "device": "cuda",
+                "backend": "torch",
                 "version": "yolov5m.pt",
                 "imgsz": 640,
                 "conf": 0.50,
@@ -54,13 +55,33 @@ class ConfigManager:
                 "appearance_weight": 0.4,
                 "motion_weight": 0.4,
                 "iou_weight": 0.2,
-                "nn_budget": 100
+                "nn_budget": 100,
+                "gating_threshold": 0.0,
+                "max_iou_distance": 0.7,
+                "lazy_appearance": False,
+                "appearance_refresh": 10
             },
             "player": {},
             "detection_thread": {
                 "detection_fps": 10,
                 "delay_seconds": 5.0,
-                "enable_mot_writer": False
+                "enable_mot_writer": False,
+                "grab_only": False,
+                "offline": False,
+                "adaptive_rate": False,
+                "min_detection_fps": 2,
+                "max_detection_fps": 15,
+                "roi_crop": False,
+                "roi_padding": 32,
+                "roi_tiles": 1,
+                "batch_size": 1,
+                "batch_timeout_ms": 50,
+                "detection_cache": False,
+                "cache_dir": "detection_cache",
+                "detector_process": False,
+                "full_detection_interval": 1,
+                "refine_imgsz": 256,
+                "refine_padding": 32
             },
             "crosswalk_monitor": {
                 "traffic_light_fps": 20
@@ -1,26 +1,48 @@
 from threading import Lock
 
+import numpy as np
+
+from stream.detection.DetectionBatch import DetectionBatch
+
 class GlobalState:
 
     def __init__(self):
         self._lock            = Lock()
-        self._objects         = {}
-        self._last_seen       = {}
+        self._tracks          = DetectionBatch.empty()
+        self._last_seen       = np.empty(0, dtype=np.float64)
         self._last_capture    = 0.0
+        self._objects         = None
 
-    def update(self, objects_list, capture_time: float):
+    def update(self, batch: DetectionBatch, capture_time: float):
+        # merged by track id; the stored batch is replaced, never written to,
+        # so readers can keep the one they got
         with self._lock:
-            for obj in objects_list:
-                self._objects[obj.id]   = obj
-                self._last_seen[obj.id] = capture_time
+            if len(batch):
+                keep = ~np.isin(self._tracks.track_id, batch.track_id)
+                self._tracks = DetectionBatch(
+                    np.concatenate([self._tracks.records[keep], batch.records])
+                )
+                self._last_seen = np.concatenate(
+                    [self._last_seen[keep], np.full(len(batch), capture_time)]
+                )
+                self._objects = None
             self._last_capture = capture_time
 
     def remove(self, ids):
         with self._lock:
-            for tid in ids:
-                self._objects.pop(tid, None)
-                self._last_seen.pop(tid, None)
+            keep = ~np.isin(self._tracks.track_id, list(ids))
+            if not keep.all():
+                self._tracks = self._tracks[keep]
+                self._last_seen = self._last_seen[keep]
+                self._objects = None
+
+    def get_batch(self):
+        with self._lock:
+            return self._tracks, self._last_capture
 
     def get(self):
+        # DetectedObject views for the GUI, built once per state change
         with self._lock:
-            return list(self._objects.values()), self._last_capture
\ No newline at end of file
+            if self._objects is None:
+                self._objects = self._tracks.objects()
+            return list(self._objects), self._last_capture
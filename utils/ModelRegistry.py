@@ -0,0 +1,69 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.benchmark.MetricSignals import signals
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, shared by every stream.
+
+    Models are keyed by (kind, weights, device, backend). get() loads a model
+    on first use, one loader per key, and every later caller gets the same
+    instance; preload() does that on a background thread at start-up so the
+    first stream finds it ready. Load time, warm-up included, is kept in
+    ``load_times`` and reported through ``model_load_logged``.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._lock        = threading.Lock()
+        self._models      = {}
+        self._load_locks  = {}
+        self._infer_locks = {}
+        self.load_times   = {}
+        self._executor    = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ModelPreload")
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ModelRegistry()
+            return cls._instance
+
+    def _load_lock(self, key):
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def inference_lock(self, key) -> threading.Lock:
+        """Lock for models whose call path is not safe to share between threads."""
+        with self._lock:
+            return self._infer_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, factory):
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+        with self._load_lock(key):
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+            t0 = time.perf_counter()
+            model = factory()
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self._models[key] = model
+                self.load_times[key] = elapsed
+        print(f"Loaded {key} in {elapsed:.2f}s")
+        signals.model_load_logged.emit(str(key), elapsed)
+        return model
+
+    def preload(self, key, factory):
+        future = self._executor.submit(self.get, key, factory)
+        # a failed preload is retried, and reported, by the first get()
+        future.add_done_callback(
+            lambda f: f.exception() and print(f"Preloading {key} failed: {f.exception()}")
+        )
+        return future
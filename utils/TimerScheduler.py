@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import threading
+import time
+
+from utils.benchmark.MetricSignals import signals
+
+
+class TimerHandle:
+    __slots__ = ("deadline", "callback", "args", "cancelled", "done")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline  = deadline
+        self.callback  = callback
+        self.args      = args
+        self.cancelled = False
+        self.done      = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @property
+    def pending(self):
+        return not (self.cancelled or self.done)
+
+
+class TimerScheduler:
+    """Process-wide deadline scheduler: one heap, one dispatch thread.
+
+    Deadlines are kept on the monotonic clock. Callers that think in wall-clock
+    timestamps (capture_time + delay) use call_at(), which converts once when
+    the deadline is posted. Callbacks run on the dispatch thread and must be
+    short; anything heavy belongs in the caller's own thread.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._heap  = []
+        self._seq   = itertools.count()
+        self._cond  = threading.Condition()
+
+        self._stats_lock    = threading.Lock()
+        self.dispatched     = 0
+        self.total_lateness = 0.0
+        self.max_lateness   = 0.0
+
+        self._thread = threading.Thread(
+            target=self._dispatch_loop, name="TimerScheduler", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = TimerScheduler()
+            return cls._instance
+
+    def call_later(self, delay: float, callback, *args) -> TimerHandle:
+        handle = TimerHandle(time.monotonic() + max(0.0, delay), callback, args)
+        with self._cond:
+            heapq.heappush(self._heap, (handle.deadline, next(self._seq), handle))
+            # only wake the dispatcher if the new deadline is the earliest one
+            if self._heap[0][2] is handle:
+                self._cond.notify()
+        return handle
+
+    def call_at(self, wall_time: float, callback, *args) -> TimerHandle:
+        return self.call_later(wall_time - time.time(), callback, *args)
+
+    def wait_until(self, wall_time: float):
+        """Block the calling thread until the given time.time() deadline."""
+        delay = wall_time - time.time()
+        if delay <= 0:
+            return
+        event = threading.Event()
+        self.call_later(delay, event.set)
+        event.wait()
+
+    def lateness_stats(self):
+        with self._stats_lock:
+            mean = self.total_lateness / self.dispatched if self.dispatched else 0.0
+            return {
+                "dispatched": self.dispatched,
+                "mean_lateness": mean,
+                "max_lateness": self.max_lateness,
+            }
+
+    def _record_lateness(self, late: float):
+        with self._stats_lock:
+            self.dispatched += 1
+            self.total_lateness += late
+            self.max_lateness = max(self.max_lateness, late)
+        signals.timer_lateness_logged.emit(late)
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(remaining)
+
+            late = time.monotonic() - handle.deadline
+            handle.done = True
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                print(f"TimerScheduler callback failed: {e}")
+            self._record_lateness(late)
@@ -0,0 +1,71 @@
+"""Micro-benchmark of the tracker's two assignment paths.
+
+Times one dense Hungarian solve against the per-connected-component solve
+on synthetic gated scenes of growing size, after checking that both give
+the same number of matches and the same total cost. The crossover is what
+DENSE_ASSIGN_CELLS in DeepsortTracker is set from:
+
+    python -m utils.benchmark.AssignmentBenchmark
+"""
+import time
+
+import numpy as np
+
+from stream.detection.Deepsort.DeepsortTracker import (
+    DENSE_ASSIGN_CELLS, assign_components, assign_dense,
+)
+
+# tracks spread over a 2000 px scene, 80% of them detected with some
+# jitter; a pair is feasible within GATE_RADIUS pixels
+SCENE_SIZE = 2000.0
+GATE_RADIUS = 20.0
+
+
+def build_problem(n_tracks, seed=0):
+    rng = np.random.default_rng(seed)
+    n_dets = int(n_tracks * 0.8)
+    tracks = rng.uniform(0, SCENE_SIZE, size=(n_tracks, 2))
+    dets = tracks[rng.permutation(n_tracks)[:n_dets]] + rng.normal(0, 3, size=(n_dets, 2))
+    cost = np.linalg.norm(tracks[:, None] - dets[None], axis=2)
+    return cost, cost <= GATE_RADIUS
+
+
+def check_equivalent(cost, feasible):
+    dense = assign_dense(cost, feasible)
+    split = assign_components(cost, feasible)
+    assert len(dense[0]) == len(split[0]), (len(dense[0]), len(split[0]))
+    assert feasible[split].all()
+    # ties may pair differently, the optimum may not
+    np.testing.assert_allclose(cost[dense].sum(), cost[split].sum(), rtol=1e-9, atol=1e-9)
+
+
+def _time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(repeats=5):
+    # equivalence over many small random problems, dense and sparse gating
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        n_tracks, n_dets = rng.integers(1, 40, size=2)
+        cost = rng.uniform(0, 10, size=(n_tracks, n_dets))
+        check_equivalent(cost, cost <= rng.uniform(0.5, 10))
+
+    print(f"current DENSE_ASSIGN_CELLS = {DENSE_ASSIGN_CELLS}")
+    print(f"{'tracks':>6} {'dets':>5} {'cells':>8} {'dense ms':>9} {'split ms':>9} {'speedup':>8}")
+    for n_tracks in (30, 60, 200, 350, 500, 1000, 2000):
+        cost, feasible = build_problem(n_tracks)
+        check_equivalent(cost, feasible)
+        t_dense = _time(lambda: assign_dense(cost, feasible), repeats)
+        t_split = _time(lambda: assign_components(cost, feasible), repeats)
+        print(f"{n_tracks:>6} {cost.shape[1]:>5} {cost.size:>8} "
+              f"{t_dense * 1e3:>9.2f} {t_split * 1e3:>9.2f} {t_dense / t_split:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,9 @@ class Benchmark:
             self.scheduling_delays   = []
             self.total_latencies     = []
             self.consumer_latencies  = []
+            self.timer_lateness      = []
+            self.queue_drops         = {}
+            self.model_load_times    = {}
             self.per_second          = {}
 
     def log_frame(self):
@@ -69,6 +72,18 @@ class Benchmark:
         with self._lock:
             self.consumer_latencies.append(dt)
 
+    def log_timer_lateness(self, dt: float):
+        with self._lock:
+            self.timer_lateness.append(dt)
+
+    def log_queue_drop(self, queue_name: str):
+        with self._lock:
+            self.queue_drops[queue_name] = self.queue_drops.get(queue_name, 0) + 1
+
+    def log_model_load(self, model: str, dt: float):
+        with self._lock:
+            self.model_load_times[model] = dt
+
     def get_per_second(self):
         """Return data for each second since start (sec_idx, {'frames':…, 'delays':…})."""
         with self._lock:
@@ -0,0 +1,157 @@
+"""Micro-benchmark of DeepSortTracker's cost matrices at rush-hour track counts.
+
+Compares the vectorised, per-class cost matrices against the former
+per-pair loop over every track and detection, kept here as the reference,
+on synthetic tracks and detections:
+
+    python -m utils.benchmark.CostMatrixBenchmark
+"""
+import copy
+import time
+
+import numpy as np
+
+from stream.detection.Deepsort.DeepsortTracker import DeepSortTracker, PERSON_CLASS_IDX
+from stream.detection.Deepsort.Track import Track
+
+FEATURE_DIM = 2048
+CLASSES = [0, 0, 0, 2, 2, 7]
+
+
+def _iou(bbox1, bbox2):
+    xA = max(bbox1[0], bbox2[0])
+    yA = max(bbox1[1], bbox2[1])
+    xB = min(bbox1[2], bbox2[2])
+    yB = min(bbox1[3], bbox2[3])
+
+    interArea = max(0, xB - xA + 1) * max(0, yB - yA + 1)
+    boxAArea = (bbox1[2] - bbox1[0] + 1) * (bbox1[3] - bbox1[1] + 1)
+    boxBArea = (bbox2[2] - bbox2[0] + 1) * (bbox2[3] - bbox2[1] + 1)
+    unionArea = float(boxAArea + boxBArea - interArea)
+    if unionArea == 0:
+        return 0.0
+    return interArea / unionArea
+
+
+def reference_cost(tracker, points, rows, features, timestamp, detection_fps):
+    n_tracks, n_dets = len(tracker.tracks), len(rows)
+    cost_matrix = np.zeros((n_tracks, n_dets), dtype=float)
+    motion_matrix = np.zeros_like(cost_matrix)
+    appearance_matrix = np.zeros_like(cost_matrix)
+
+    for i, track in enumerate(tracker.tracks):
+        track_cls = track.bbox[4] if len(track.bbox) > 4 else PERSON_CLASS_IDX
+        pred_centroid = track.predict_with_dt(detection_fps, timestamp)
+        gallery = track.get_gallery()
+        if len(gallery):
+            gallery_arr = np.stack(gallery, axis=0)
+            gallery_norms = np.linalg.norm(gallery_arr, axis=1) + 1e-6
+        else:
+            gallery_arr = None
+
+        for j in range(n_dets):
+            det_centroid, det_bbox = points[j], rows[j]
+            det_feat = features[j] if features is not None else None
+            if det_bbox[4] != track_cls:
+                cost_matrix[i, j] = motion_matrix[i, j] = appearance_matrix[i, j] = 1e6
+                continue
+
+            m_dist = np.linalg.norm(np.asarray(pred_centroid) - det_centroid)
+            motion_matrix[i, j] = m_dist
+            if det_feat is not None and gallery_arr is not None:
+                sims = gallery_arr @ det_feat / (gallery_norms * (np.linalg.norm(det_feat) + 1e-6))
+                a_dist = 1.0 - float(np.max(sims))
+            else:
+                a_dist = 1.0
+            appearance_matrix[i, j] = a_dist
+            cost_matrix[i, j] = (
+                tracker.motion_weight * m_dist
+                + tracker.appearance_weight * a_dist
+                + tracker.iou_weight * (1.0 - _iou(track.bbox, det_bbox))
+            )
+    return cost_matrix, motion_matrix, appearance_matrix
+
+
+def grouped_cost(tracker, points, rows, features, timestamp, detection_fps):
+    """The tracker's per-class matrices laid out on the full track x detection grid."""
+    out = [np.full((len(tracker.tracks), len(rows)), 1e6) for _ in range(3)]
+    tracker._predict(timestamp, detection_fps)
+    for track_idx, det_idx in tracker._class_groups(rows[:, 4]):
+        parts = tracker._compute_cost(track_idx, points[det_idx], rows[det_idx], features[det_idx])
+        for full, part in zip(out, parts):
+            full[np.ix_(track_idx, det_idx)] = part
+    return out
+
+
+def _boxes(rng, n):
+    xy = rng.uniform(0, 1800, size=(n, 2))
+    wh = rng.uniform(20, 200, size=(n, 2))
+    return np.trunc(np.hstack([xy, xy + wh])).astype(np.float32)
+
+
+def build_scene(n_tracks, n_dets, gallery_size, seed=0):
+    rng = np.random.default_rng(seed)
+    tracker = DeepSortTracker(
+        max_disappeared=30, max_distance=50.0, device="cpu",
+        appearance_weight=0.5, motion_weight=0.3, iou_weight=0.2,
+        nn_budget=100, homography_matrix=None,
+        # the cost matrix never calls the extractors
+        person_extractor=object(), vehicle_extractor=object(),
+    )
+    classes = rng.choice(CLASSES, size=n_tracks + n_dets).astype(np.float32)
+    boxes = _boxes(rng, n_tracks + n_dets)
+    for i in range(n_tracks):
+        row = np.array([*boxes[i], classes[i], 0.9], dtype=np.float32)
+        track = Track(
+            i, row, tuple(rng.uniform(0, 1800, 2)),
+            nn_budget=100, gallery=tracker.gallery, kalman=tracker.kalman,
+        )
+        track.kalman_filter.x[2:, 0] = rng.normal(0, 30, 2)
+        track.last_timestamp = 0.0
+        for _ in range(rng.integers(0, gallery_size + 1)):
+            track.gallery.append(track.gallery_slot, rng.normal(size=FEATURE_DIM).astype(np.float32))
+        tracker.tracks.append(track)
+
+    rows = np.column_stack([
+        boxes[n_tracks:], classes[n_tracks:], np.full(n_dets, 0.8)
+    ]).astype(np.float32)
+    points = rng.uniform(0, 1800, size=(n_dets, 2)).astype(np.float32)
+    features = rng.normal(size=(n_dets, FEATURE_DIM)).astype(np.float32)
+    return tracker, points, rows, features
+
+
+def _fresh(tracker, state):
+    # predicting steps the filters, so every run gets its own tracks (and
+    # the batched filter and gallery they point into)
+    tracker.tracks, tracker.kalman, tracker.gallery = copy.deepcopy(state)
+    return tracker
+
+
+def _time(tracker, state, fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        _fresh(tracker, state)
+        t0 = time.perf_counter()
+        fn(tracker)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(repeats=5):
+    print(f"{'tracks':>6} {'dets':>5} {'gallery':>7} {'loop ms':>9} {'vector ms':>10} {'speedup':>8}")
+    for n_tracks, n_dets, gallery in ((20, 15, 10), (60, 40, 30), (100, 60, 100)):
+        tracker, points, rows, features = build_scene(n_tracks, n_dets, gallery)
+        args = (points, rows, features, 0.1, 10.0)
+
+        state = (tracker.tracks, tracker.kalman, tracker.gallery)
+        expected = reference_cost(_fresh(tracker, state), *args)
+        for a, b in zip(expected, grouped_cost(_fresh(tracker, state), *args)):
+            np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-5)
+
+        t_loop = _time(tracker, state, lambda t: reference_cost(t, *args), repeats)
+        t_vec = _time(tracker, state, lambda t: grouped_cost(t, *args), repeats)
+        print(f"{n_tracks:>6} {n_dets:>5} {gallery:>7} {t_loop * 1e3:>9.2f} {t_vec * 1e3:>10.2f} {t_loop / t_vec:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,3 +37,15 @@ class MetricReporter(QObject):
     @pyqtSlot(float)
     def on_consumer(self, dt):
         Benchmark.instance().log_consumer_latency(dt)
+
+    @pyqtSlot(float)
+    def on_timer_lateness(self, dt):
+        Benchmark.instance().log_timer_lateness(dt)
+
+    @pyqtSlot(str)
+    def on_queue_drop(self, queue_name):
+        Benchmark.instance().log_queue_drop(queue_name)
+
+    @pyqtSlot(str, float)
+    def on_model_load(self, model, dt):
+        Benchmark.instance().log_model_load(model, dt)
@@ -11,5 +11,8 @@ class MetricSignals(QObject):
     scheduling_logged    = pyqtSignal(float)
     total_latency_logged = pyqtSignal(float)
     consumer_logged      = pyqtSignal(float)
+    timer_lateness_logged = pyqtSignal(float)
+    queue_drop_logged    = pyqtSignal(str)
+    model_load_logged    = pyqtSignal(str, float)
 
 signals = MetricSignals()